@@ -135,6 +135,7 @@ class RecordNormalizer {
     }
 
     record.opening_hours = this.extractRichtextContent(component.opening_hours);
+    record.timezone = component.timezone || '';
 
     // Amenities & Features
     record.wifi = component.wifi === true;
@@ -151,12 +152,12 @@ class RecordNormalizer {
     if (component.image?.filename) {
       record.image = component.image.filename;
     }
-    if (component.gallery && Array.isArray(component.gallery)) {
-      record.gallery = component.gallery.map(img => img.filename).filter(Boolean);
-    }
+    record.gallery = Array.isArray(component.gallery)
+      ? component.gallery.map(img => img?.filename).filter(Boolean)
+      : [];
 
     // Tags & Categories
-    record.tags = component.tags ? component.tags.split(',').map(tag => tag.trim()).filter(Boolean) : [];
+    record.tags = this.splitList(component.tags);
     record.price_range = component.price_range || '';
     record.specialties = component.specialties || '';
 
@@ -194,26 +195,42 @@ class RecordNormalizer {
 
   /**
    * Extract plain text content from Storyblok richtext format
-   * @param {Object} richtext - Storyblok richtext object
+   * Paragraphs are separated by newlines; plain strings pass through trimmed.
+   * @param {Object|string} richtext - Storyblok richtext object or legacy text
    * @returns {string} Plain text content
    */
   extractRichtextContent(richtext) {
+    if (typeof richtext === 'string') {
+      return richtext.trim();
+    }
     if (!richtext?.content) {
       return '';
     }
 
-    let text = '';
-
     const extractFromNode = (node) => {
+      if (!node) {
+        return '';
+      }
       if (node.type === 'text') {
-        text += node.text;
-      } else if (node.content && Array.isArray(node.content)) {
-        node.content.forEach(extractFromNode);
+        return node.text || '';
       }
+      return Array.isArray(node.content) ? node.content.map(extractFromNode).join('') : '';
     };
 
-    richtext.content.forEach(extractFromNode);
-    return text.trim();
+    // Top-level blocks (paragraphs) become lines, same as worker/richtext.py
+    const blocks = richtext.type === 'doc' ? richtext.content : [richtext];
+    return blocks.map(extractFromNode).filter(Boolean).join('\n').trim();
+  }
+
+  /**
+   * Split a comma-separated text field into trimmed, non-empty items
+   * Same as split_list in worker/normalizer.py.
+   * @param {string|Array} value - Comma-separated text or an existing list
+   * @returns {Array} List items
+   */
+  splitList(value) {
+    const items = Array.isArray(value) ? value.map(String) : typeof value === 'string' ? value.split(',') : [];
+    return items.map(item => item.trim()).filter(Boolean);
   }
 
   /**
@@ -256,7 +273,7 @@ class RecordNormalizer {
       // Set defaults for missing metadata
       record.rating = null;
       record.ai_summary = '';
-      record.ai_tags = '';
+      record.ai_tags = [];
       record.detected_language = 'en';
       record.open_now = false;
       return;
@@ -266,8 +283,7 @@ class RecordNormalizer {
 
     // If tags aren't already set from component level, set them from metadata
     if (!record.tags || record.tags.length === 0) {
-      const tags = meta.tags ? meta.tags.split(',').map(tag => tag.trim()).filter(Boolean) : [];
-      record.tags = tags;
+      record.tags = this.splitList(meta.tags);
     }
 
     // For backward compatibility
@@ -282,7 +298,7 @@ class RecordNormalizer {
 
     // AI / Enrichment Fields
     record.ai_summary = meta.ai_summary || '';
-    record.ai_tags = meta.ai_tags || '';
+    record.ai_tags = this.splitList(meta.ai_tags);
     record.detected_language = meta.detected_language || 'en';
     record.open_now = meta.open_now === true;
 
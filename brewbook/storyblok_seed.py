@@ -3,7 +3,15 @@ import os
 import sys
 import time
 import requests
-from typing import Dict, Any, Optional
+from datetime import datetime, timezone
+from typing import Dict, Any, Iterator, List, Optional
+
+# Shared helpers live alongside the webhook worker
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "worker"))
+from opening_hours import open_now_state, refresh_open_now
+from reconcile import DIGEST_ATTRIBUTE, plan_reconcile
+from schemas import CAFE_SCHEMA, EVENT_SCHEMA, METADATA_SCHEMA
+from slugs import find_collisions, slugify, unique_slugs
 
 # Load environment variables from .env file
 def load_env_file():
@@ -133,79 +141,371 @@ def upsert_story(name: str, slug: str, content: Dict[str, Any], content_type: st
         created = api("POST", "/stories", json=payload).json()
         return created["story"]["id"]
 
+CDN_BASE = "https://api.storyblok.com/v2/cdn"
+
+def iter_stories(per_page: int = 100) -> Iterator[Dict[str, Any]]:
+    """
+    Stream every published story with content, one Content Delivery API page at a time.
+
+    The CDN list endpoint includes content, so a run costs one request per
+    page rather than one per story, and ``version=published`` returns the
+    live version even when a story has unpublished draft changes. Paging
+    stops at the first short or empty page rather than trusting the Total
+    header, which proxies and some API versions drop.
+    """
+    token = os.getenv("STORYBLOK_TOKEN")
+    if not token:
+        sys.exit("Missing STORYBLOK_TOKEN env var (Content Delivery API token).")
+    # A fresh cache version bypasses CDN caching, so drift is judged on current content
+    params = {"token": token, "version": "published", "per_page": per_page, "cv": int(time.time())}
+    page = 1
+    while True:
+        resp = requests.get(f"{CDN_BASE}/stories", params={**params, "page": page})
+        if resp.status_code >= 400:
+            raise RuntimeError(f"GET /cdn/stories failed [{resp.status_code}] {resp.text}")
+        stories = resp.json().get("stories", [])
+        yield from stories
+        if len(stories) < per_page:
+            return
+        page += 1
+
+# ---------- Search Index ----------
+def algolia_api(method: str, path: str, **kwargs) -> requests.Response:
+    app_id = os.getenv("ALGOLIA_APPLICATION_ID")
+    key = os.getenv("ALGOLIA_WRITE_API_KEY")
+    if not app_id or not key:
+        sys.exit("Missing ALGOLIA_APPLICATION_ID or ALGOLIA_WRITE_API_KEY env vars.")
+    index = os.getenv("ALGOLIA_INDEX_NAME", "brewbook")
+    url = f"https://{app_id}.algolia.net/1/indexes/{index}{path}"
+    headers = {"X-Algolia-Application-Id": app_id, "X-Algolia-API-Key": key}
+    resp = requests.request(method, url, headers=headers, **kwargs)
+    if resp.status_code >= 400:
+        raise RuntimeError(f"{method} {path} failed [{resp.status_code}] {resp.text}")
+    return resp
+
+def index_digests() -> Dict[str, Optional[str]]:
+    """Read objectID -> stored digest for every record, without fetching record bodies."""
+    digests: Dict[str, Optional[str]] = {}
+    body: Dict[str, Any] = {"attributesToRetrieve": ["objectID", DIGEST_ATTRIBUTE], "hitsPerPage": 1000}
+    while True:
+        page = algolia_api("POST", "/browse", json=body).json()
+        for hit in page.get("hits", []):
+            digests[hit["objectID"]] = hit.get(DIGEST_ATTRIBUTE)
+        if not page.get("cursor"):
+            return digests
+        body = {"cursor": page["cursor"]}
+
+def reconcile(dry_run: bool = False, batch_size: int = 1000, delete_orphans: bool = False):
+    """
+    Write only missing, stale or orphaned records to the search index.
+
+    When the orphans are an implausibly large share of the index (see
+    ``MAX_ORPHAN_FRACTION``) they are reported but not deleted unless
+    ``delete_orphans`` confirms it; a truncated story listing must not wipe
+    the index.
+    """
+    print("Reading index digests…")
+    digests = index_digests()
+    print(f"Index has {len(digests)} records. Streaming stories…")
+    plan = plan_reconcile(iter_stories(), digests)
+    print(f"Reconcile: {plan.summary()}")
+    if plan.orphans_implausible() and not delete_orphans:
+        print(f"Warning: {len(plan.orphaned)} orphans against {plan.checked} stories checked looks like an "
+              f"incomplete story listing; skipping deletes (re-run with --delete-orphans to apply them)")
+        plan = plan.without_orphans()
+    if dry_run or not plan.drift:
+        return plan
+    for batch in plan.batches(batch_size):
+        algolia_api("POST", "/batch", json={"requests": batch})
+        print(f"Applied {len(batch)} fixes")
+    return plan
+
+def refresh_open_now_flags(watch: bool = False, max_sleep: float = 3600.0):
+    """
+    Bring every café record's open_now in line with its hours at café-local time.
+
+    Only records whose value flipped are written. With ``watch`` the command
+    keeps running and wakes up at the next opening/closing time (re-reading
+    the index at least every ``max_sleep`` seconds to pick up new cafés).
+    """
+    body: Dict[str, Any] = {"attributesToRetrieve": ["objectID", "type", "opening_hours", "timezone", "open_now"],
+                            "hitsPerPage": 1000}
+    while True:
+        cafes = []
+        page_body = body
+        while True:
+            page = algolia_api("POST", "/browse", json=page_body).json()
+            cafes += [hit for hit in page.get("hits", []) if hit.get("type") == "cafe"]
+            if not page.get("cursor"):
+                break
+            page_body = {"cursor": page["cursor"]}
+        updates, next_change = refresh_open_now(cafes)
+        if updates:
+            algolia_api("POST", "/batch", json={"requests": [
+                {"action": "partialUpdateObject", "body": update} for update in updates
+            ]})
+        print(f"open_now: {len(updates)} of {len(cafes)} cafés updated; next change {next_change or 'never'}")
+        if not watch:
+            return updates
+        wait = (next_change - datetime.now(timezone.utc)).total_seconds() if next_change else max_sleep
+        time.sleep(min(max(wait, 1.0), max_sleep))
+
 # ---------- Seed Data ----------
-def main():
-    # 1) Components
-    metadata_schema = {
-        "tags": {"type": "text", "display_name": "Tags (comma-separated)"},
-        "opening_hours": {"type": "richtext", "display_name": "Opening Hours (structured)"},
-        "rating": {"type": "number"},
-        "specialties": {"type": "text", "display_name": "Coffee specialties"},
-        "ai_summary": {"type": "text", "display_name": "AI Generated Summary"},
-        "ai_tags": {"type": "text", "display_name": "AI Generated Tags"},
-        "detected_language": {"type": "text", "display_name": "Detected Language"},
-        "open_now": {"type": "boolean", "display_name": "Currently Open"}
-    }
-    cafe_schema = {
-        # Basic Info
-        "title": {"type": "text", "display_name": "Café Title"},
-        "description": {"type": "richtext", "display_name": "Long Description"},
-        "short_summary": {"type": "text", "display_name": "Short Summary (1-2 sentences)"},
-
-        # Location & Hours
-        "address": {"type": "text", "display_name": "Street Address"},
-        "city": {"type": "text", "display_name": "City"},
-        "geo_location": {"type": "text", "display_name": "Latitude,Longitude"},
-        "opening_hours": {"type": "richtext", "display_name": "Opening Hours (structured)"},
-
-        # Amenities & Features
-        "wifi": {"type": "boolean", "display_name": "WiFi Available"},
-        "power_outlets": {"type": "boolean", "display_name": "Power Outlets Available"},
-        "noise_level": {"type": "option", "display_name": "Noise Level", "options": [
-            {"name": "Quiet", "value": "quiet"},
-            {"name": "Moderate", "value": "moderate"},
-            {"name": "Loud", "value": "loud"}
-        ]},
-        "seating_capacity": {"type": "option", "display_name": "Seating Capacity", "options": [
-            {"name": "Small (1-20)", "value": "small"},
-            {"name": "Medium (21-50)", "value": "medium"},
-            {"name": "Large (50+)", "value": "large"}
-        ]},
-        "outdoor_seating": {"type": "boolean", "display_name": "Outdoor Seating"},
-        "pet_friendly": {"type": "boolean", "display_name": "Pet Friendly"},
-
-        # Media
-        "hero_image": {"type": "asset", "display_name": "Hero Image"},
-        "gallery": {"type": "asset", "display_name": "Gallery Images", "multiple": True},
-
-        # Tags & Categories
-        "tags": {"type": "text", "display_name": "Tags (comma-separated)"},
-        "price_range": {"type": "option", "display_name": "Price Range", "options": [
-            {"name": "$", "value": "budget"},
-            {"name": "$$", "value": "moderate"},
-            {"name": "$$$", "value": "expensive"}
-        ]},
-        "specialties": {"type": "text", "display_name": "Coffee Specialties"},
-
-        # Legacy fields for compatibility
-        "name": {"type": "text", "display_name": "Legacy Name Field"},
-        "image": {"type": "asset", "display_name": "Legacy Image Field"},
-        "location": {"type": "text", "display_name": "Legacy Location Field"},
-        "metadata": {"type": "bloks", "restrict_components": True, "component_whitelist": ["metadata"]}
+CITY_TIMEZONES = {
+    "Amsterdam": "Europe/Amsterdam",
+    "Berlin": "Europe/Berlin",
+    "Paris": "Europe/Paris",
+    "Lisbon": "Europe/Lisbon",
+    "Madrid": "Europe/Madrid",
+    "London": "Europe/London",
+    "Copenhagen": "Europe/Copenhagen",
+    "Vienna": "Europe/Vienna",
+    "Prague": "Europe/Prague",
+    "Budapest": "Europe/Budapest",
+}
+
+CAFES_DATA = [
+    {
+        "title": "Demo Coffee Central",
+        "address": "123 Coffee Street",
+        "city": "Amsterdam",
+        "geo_location": "52.3676,4.9041",
+        "tags": "study spot,wifi,hipster,power outlets",
+        "noise_level": "moderate",
+        "seating_capacity": "medium",
+        "specialties": "Single Origin Coffee, Cold Brew, Flat White",
+        "price_range": "moderate",
+        "wifi": True,
+        "power_outlets": True,
+        "outdoor_seating": False,
+        "pet_friendly": True,
+        "opening_hours": "Monday-Friday: 7:00-19:00, Saturday-Sunday: 8:00-20:00",
+        "short_description": "A trendy study-friendly café in Amsterdam's city center, perfect for digital nomads and coffee enthusiasts.",
+        "rating": 4.5,
+        "img": "https://images.unsplash.com/photo-1509042239860-f550ce710b93"
+    },
+    {
+        "title": "Café Aroma Artisan",
+        "address": "456 Bean Boulevard",
+        "city": "Berlin",
+        "geo_location": "52.5200,13.4050",
+        "tags": "hipster,late night,artisan,specialty coffee",
+        "noise_level": "quiet",
+        "seating_capacity": "small",
+        "specialties": "Pour Over, Single Origin Espresso, Chemex",
+        "price_range": "expensive",
+        "wifi": True,
+        "power_outlets": False,
+        "outdoor_seating": True,
+        "pet_friendly": False,
+        "opening_hours": "Monday-Sunday: 8:00-22:00",
+        "short_description": "An intimate artisan coffee house in Berlin, known for exceptional pour-over coffee and late-night hours.",
+        "rating": 4.8,
+        "img": "https://images.unsplash.com/photo-1495474472287-4d71bcdd2085"
+    },
+    {
+        "title": "Bean & Byte Tech Café",
+        "address": "789 Digital Drive",
+        "city": "Paris",
+        "geo_location": "48.8566,2.3522",
+        "tags": "study spot,tech,power outlets,coworking",
+        "noise_level": "moderate",
+        "seating_capacity": "large",
+        "specialties": "Nitro Coffee, Matcha Lattes, Iced Americano",
+        "price_range": "moderate",
+        "wifi": True,
+        "power_outlets": True,
+        "outdoor_seating": False,
+        "pet_friendly": False,
+        "opening_hours": "Monday-Friday: 6:30-20:00, Saturday-Sunday: 8:00-18:00",
+        "short_description": "A modern tech-focused café in Paris with excellent WiFi, perfect for remote work and studying.",
+        "rating": 4.3,
+        "img": "https://images.unsplash.com/photo-1517705008128-361805f42e86"
+    },
+    {
+        "title": "Roast & Route Travel Café",
+        "address": "321 Explorer Lane",
+        "city": "Lisbon",
+        "geo_location": "38.7223,-9.1393",
+        "tags": "outdoor seating,pet friendly,casual,travel theme",
+        "noise_level": "loud",
+        "seating_capacity": "medium",
+        "specialties": "Dark Roast, Portuguese Pastéis, Galão",
+        "price_range": "budget",
+        "wifi": True,
+        "power_outlets": True,
+        "outdoor_seating": True,
+        "pet_friendly": True,
+        "opening_hours": "Monday-Sunday: 7:30-19:30",
+        "short_description": "A vibrant travel-themed café in Lisbon with pet-friendly outdoor seating and local pastries.",
+        "rating": 4.2,
+        "img": "https://images.unsplash.com/photo-1511920170033-f8396924c348"
+    },
+    {
+        "title": "Morning Grind Early Bird",
+        "address": "654 Sunrise Street",
+        "city": "Madrid",
+        "geo_location": "40.4168,-3.7038",
+        "tags": "early morning,quick service,breakfast,takeaway",
+        "noise_level": "moderate",
+        "seating_capacity": "small",
+        "specialties": "Cortado, Spanish Tortilla, Café con Leche",
+        "price_range": "budget",
+        "wifi": False,
+        "power_outlets": False,
+        "outdoor_seating": False,
+        "pet_friendly": False,
+        "opening_hours": "Monday-Friday: 6:00-14:00, Saturday-Sunday: 7:00-15:00",
+        "short_description": "An early-rising local favorite in Madrid, perfect for quick breakfast and authentic Spanish coffee.",
+        "rating": 4.1,
+        "img": "https://images.unsplash.com/photo-1453614512568-c4024d13c247"
+    },
+    {
+        "title": "Espresso Lane Speed Café",
+        "address": "987 Rush Road",
+        "city": "London",
+        "geo_location": "51.5074,-0.1278",
+        "tags": "quick service,takeaway,business,commuter",
+        "noise_level": "loud",
+        "seating_capacity": "small",
+        "specialties": "Espresso, Americano, Flat White, Grab & Go",
+        "price_range": "moderate",
+        "wifi": True,
+        "power_outlets": True,
+        "outdoor_seating": False,
+        "pet_friendly": False,
+        "opening_hours": "Monday-Friday: 6:00-18:00, Saturday: 8:00-16:00, Sunday: Closed",
+        "short_description": "A fast-paced London café designed for busy commuters and business professionals.",
+        "rating": 3.9,
+        "img": "https://images.unsplash.com/photo-1470337458703-46ad1756a187"
+    },
+    {
+        "title": "Pour Over Place Artisan",
+        "address": "147 Craft Circle",
+        "city": "Copenhagen",
+        "geo_location": "55.6761,12.5683",
+        "tags": "artisan,slow coffee,quality,third wave",
+        "noise_level": "quiet",
+        "seating_capacity": "small",
+        "specialties": "V60 Pour Over, Aeropress, Scandinavian Roasts",
+        "price_range": "expensive",
+        "wifi": False,
+        "power_outlets": False,
+        "outdoor_seating": True,
+        "pet_friendly": True,
+        "opening_hours": "Tuesday-Sunday: 9:00-17:00, Monday: Closed",
+        "short_description": "A minimalist Copenhagen coffee shop dedicated to the art of slow, precise coffee brewing.",
+        "rating": 4.9,
+        "img": "https://images.unsplash.com/photo-1501339847302-ac426a4a7cbb"
+    },
+    {
+        "title": "Latte Lab Experimental",
+        "address": "258 Innovation Avenue",
+        "city": "Vienna",
+        "geo_location": "48.2082,16.3738",
+        "tags": "experimental,latte art,unique,instagram worthy",
+        "noise_level": "moderate",
+        "seating_capacity": "medium",
+        "specialties": "Signature Latte Art, Experimental Drinks, Viennese Coffee",
+        "price_range": "expensive",
+        "wifi": True,
+        "power_outlets": True,
+        "outdoor_seating": True,
+        "pet_friendly": False,
+        "opening_hours": "Monday-Sunday: 8:00-20:00",
+        "short_description": "An innovative Vienna café where coffee meets art, featuring experimental drinks and stunning latte art.",
+        "rating": 4.6,
+        "img": "https://images.unsplash.com/photo-1559056199-641a0ac8b55e"
+    },
+    {
+        "title": "Mocha Market Variety",
+        "address": "369 Flavor Street",
+        "city": "Prague",
+        "geo_location": "50.0755,14.4378",
+        "tags": "variety,desserts,sweet treats,family friendly",
+        "noise_level": "moderate",
+        "seating_capacity": "large",
+        "specialties": "Signature Mochas, Hot Chocolate, Czech Pastries",
+        "price_range": "moderate",
+        "wifi": True,
+        "power_outlets": True,
+        "outdoor_seating": True,
+        "pet_friendly": True,
+        "opening_hours": "Monday-Sunday: 8:00-21:00",
+        "short_description": "A family-friendly Prague café specializing in decadent mochas and traditional Czech desserts.",
+        "rating": 4.4,
+        "img": "https://images.unsplash.com/photo-1445077100181-a33e9ac94db0"
+    },
+    {
+        "title": "Drip District Community",
+        "address": "741 Community Corner",
+        "city": "Budapest",
+        "geo_location": "47.4979,19.0402",
+        "tags": "community,events,social,local hangout",
+        "noise_level": "moderate",
+        "seating_capacity": "large",
+        "specialties": "Drip Coffee, Community Blends, Hungarian Pastries",
+        "price_range": "budget",
+        "wifi": True,
+        "power_outlets": True,
+        "outdoor_seating": True,
+        "pet_friendly": True,
+        "opening_hours": "Monday-Sunday: 7:00-22:00",
+        "short_description": "A community-centered Budapest café that hosts local events and serves neighborhood-roasted coffee.",
+        "rating": 4.7,
+        "img": "https://images.unsplash.com/photo-1521017432531-fbd92d768814"
     }
-    event_schema = {
-        "title": {"type": "text"},
-        "description": {"type": "richtext"},
-        "date": {"type": "datetime"},
-        "image": {"type": "asset"},
-        "location": {"type": "text"},
-        "metadata": {"type": "bloks", "restrict_components": True, "component_whitelist": ["metadata"]}
+]
+
+EVENTS = [
+    {
+        "title": "Latte Art Workshop",
+        "slug": "latte-art-workshop",
+        "date": "2025-10-01T18:00:00+00:00",
+        "location": "Amsterdam, NL",
+        "img": "https://images.unsplash.com/photo-1522992319-0365e5f11656"
+    },
+    {
+        "title": "Coffee Cupping Night",
+        "slug": "coffee-cupping-night",
+        "date": "2025-10-08T18:00:00+00:00",
+        "location": "Berlin, DE",
+        "img": "https://images.unsplash.com/photo-1512568400610-62da28bc8a13"
+    },
+    {
+        "title": "Roaster Talk",
+        "slug": "roaster-talk",
+        "date": "2025-10-15T18:00:00+00:00",
+        "location": "Paris, FR",
+        "img": "https://images.unsplash.com/photo-1494415859740-21e878dd929d"
     }
+]
+
+def resolve_cafe_slugs() -> List[str]:
+    """
+    Slug every café title, keeping clear of the event slugs and of each other.
+
+    Runs before any API call so a collision can never make upsert_story
+    overwrite another story found through find_story_by_slug.
+    """
+    titles = [cafe["title"] for cafe in CAFES_DATA]
+    event_slugs = [event["slug"] for event in EVENTS]
+    for slug, names in find_collisions(titles).items():
+        print(f"Warning: slug '{slug}' is shared by {names}; adding numeric suffixes")
+    for title in titles:
+        if slugify(title) in event_slugs:
+            print(f"Warning: café '{title}' would take event slug '{slugify(title)}'; adding a numeric suffix")
+    return unique_slugs(titles, taken=event_slugs)
 
+def main():
+    # Resolve every slug up front so collisions never reach find_story_by_slug
+    cafe_slugs = resolve_cafe_slugs()
+
+    # 1) Components
     print("Ensuring components…")
-    ensure_component("metadata", metadata_schema, is_nestable=True)
-    ensure_component("cafe", cafe_schema)
-    ensure_component("event", event_schema)
+    ensure_component("metadata", METADATA_SCHEMA, is_nestable=True)
+    ensure_component("cafe", CAFE_SCHEMA)
+    ensure_component("event", EVENT_SCHEMA)
 
     # 2) Skip folders for now - create stories directly
     print("Skipping folders (not available in starter plan)…")
@@ -214,202 +514,9 @@ def main():
 
     # 3) Demo cafés
     print("Creating cafés…")
-    cafes_data = [
-        {
-            "title": "Demo Coffee Central",
-            "address": "123 Coffee Street",
-            "city": "Amsterdam",
-            "geo_location": "52.3676,4.9041",
-            "tags": "study spot,wifi,hipster,power outlets",
-            "noise_level": "moderate",
-            "seating_capacity": "medium",
-            "specialties": "Single Origin Coffee, Cold Brew, Flat White",
-            "price_range": "moderate",
-            "wifi": True,
-            "power_outlets": True,
-            "outdoor_seating": False,
-            "pet_friendly": True,
-            "opening_hours": "Monday-Friday: 7:00-19:00, Saturday-Sunday: 8:00-20:00",
-            "short_description": "A trendy study-friendly café in Amsterdam's city center, perfect for digital nomads and coffee enthusiasts.",
-            "rating": 4.5,
-            "img": "https://images.unsplash.com/photo-1509042239860-f550ce710b93"
-        },
-        {
-            "title": "Café Aroma Artisan",
-            "address": "456 Bean Boulevard",
-            "city": "Berlin",
-            "geo_location": "52.5200,13.4050",
-            "tags": "hipster,late night,artisan,specialty coffee",
-            "noise_level": "quiet",
-            "seating_capacity": "small",
-            "specialties": "Pour Over, Single Origin Espresso, Chemex",
-            "price_range": "expensive",
-            "wifi": True,
-            "power_outlets": False,
-            "outdoor_seating": True,
-            "pet_friendly": False,
-            "opening_hours": "Monday-Sunday: 8:00-22:00",
-            "short_description": "An intimate artisan coffee house in Berlin, known for exceptional pour-over coffee and late-night hours.",
-            "rating": 4.8,
-            "img": "https://images.unsplash.com/photo-1495474472287-4d71bcdd2085"
-        },
-        {
-            "title": "Bean & Byte Tech Café",
-            "address": "789 Digital Drive",
-            "city": "Paris",
-            "geo_location": "48.8566,2.3522",
-            "tags": "study spot,tech,power outlets,coworking",
-            "noise_level": "moderate",
-            "seating_capacity": "large",
-            "specialties": "Nitro Coffee, Matcha Lattes, Iced Americano",
-            "price_range": "moderate",
-            "wifi": True,
-            "power_outlets": True,
-            "outdoor_seating": False,
-            "pet_friendly": False,
-            "opening_hours": "Monday-Friday: 6:30-20:00, Saturday-Sunday: 8:00-18:00",
-            "short_description": "A modern tech-focused café in Paris with excellent WiFi, perfect for remote work and studying.",
-            "rating": 4.3,
-            "img": "https://images.unsplash.com/photo-1517705008128-361805f42e86"
-        },
-        {
-            "title": "Roast & Route Travel Café",
-            "address": "321 Explorer Lane",
-            "city": "Lisbon",
-            "geo_location": "38.7223,-9.1393",
-            "tags": "outdoor seating,pet friendly,casual,travel theme",
-            "noise_level": "loud",
-            "seating_capacity": "medium",
-            "specialties": "Dark Roast, Portuguese Pastéis, Galão",
-            "price_range": "budget",
-            "wifi": True,
-            "power_outlets": True,
-            "outdoor_seating": True,
-            "pet_friendly": True,
-            "opening_hours": "Monday-Sunday: 7:30-19:30",
-            "short_description": "A vibrant travel-themed café in Lisbon with pet-friendly outdoor seating and local pastries.",
-            "rating": 4.2,
-            "img": "https://images.unsplash.com/photo-1511920170033-f8396924c348"
-        },
-        {
-            "title": "Morning Grind Early Bird",
-            "address": "654 Sunrise Street",
-            "city": "Madrid",
-            "geo_location": "40.4168,-3.7038",
-            "tags": "early morning,quick service,breakfast,takeaway",
-            "noise_level": "moderate",
-            "seating_capacity": "small",
-            "specialties": "Cortado, Spanish Tortilla, Café con Leche",
-            "price_range": "budget",
-            "wifi": False,
-            "power_outlets": False,
-            "outdoor_seating": False,
-            "pet_friendly": False,
-            "opening_hours": "Monday-Friday: 6:00-14:00, Saturday-Sunday: 7:00-15:00",
-            "short_description": "An early-rising local favorite in Madrid, perfect for quick breakfast and authentic Spanish coffee.",
-            "rating": 4.1,
-            "img": "https://images.unsplash.com/photo-1453614512568-c4024d13c247"
-        },
-        {
-            "title": "Espresso Lane Speed Café",
-            "address": "987 Rush Road",
-            "city": "London",
-            "geo_location": "51.5074,-0.1278",
-            "tags": "quick service,takeaway,business,commuter",
-            "noise_level": "loud",
-            "seating_capacity": "small",
-            "specialties": "Espresso, Americano, Flat White, Grab & Go",
-            "price_range": "moderate",
-            "wifi": True,
-            "power_outlets": True,
-            "outdoor_seating": False,
-            "pet_friendly": False,
-            "opening_hours": "Monday-Friday: 6:00-18:00, Saturday: 8:00-16:00, Sunday: Closed",
-            "short_description": "A fast-paced London café designed for busy commuters and business professionals.",
-            "rating": 3.9,
-            "img": "https://images.unsplash.com/photo-1470337458703-46ad1756a187"
-        },
-        {
-            "title": "Pour Over Place Artisan",
-            "address": "147 Craft Circle",
-            "city": "Copenhagen",
-            "geo_location": "55.6761,12.5683",
-            "tags": "artisan,slow coffee,quality,third wave",
-            "noise_level": "quiet",
-            "seating_capacity": "small",
-            "specialties": "V60 Pour Over, Aeropress, Scandinavian Roasts",
-            "price_range": "expensive",
-            "wifi": False,
-            "power_outlets": False,
-            "outdoor_seating": True,
-            "pet_friendly": True,
-            "opening_hours": "Tuesday-Sunday: 9:00-17:00, Monday: Closed",
-            "short_description": "A minimalist Copenhagen coffee shop dedicated to the art of slow, precise coffee brewing.",
-            "rating": 4.9,
-            "img": "https://images.unsplash.com/photo-1501339847302-ac426a4a7cbb"
-        },
-        {
-            "title": "Latte Lab Experimental",
-            "address": "258 Innovation Avenue",
-            "city": "Vienna",
-            "geo_location": "48.2082,16.3738",
-            "tags": "experimental,latte art,unique,instagram worthy",
-            "noise_level": "moderate",
-            "seating_capacity": "medium",
-            "specialties": "Signature Latte Art, Experimental Drinks, Viennese Coffee",
-            "price_range": "expensive",
-            "wifi": True,
-            "power_outlets": True,
-            "outdoor_seating": True,
-            "pet_friendly": False,
-            "opening_hours": "Monday-Sunday: 8:00-20:00",
-            "short_description": "An innovative Vienna café where coffee meets art, featuring experimental drinks and stunning latte art.",
-            "rating": 4.6,
-            "img": "https://images.unsplash.com/photo-1559056199-641a0ac8b55e"
-        },
-        {
-            "title": "Mocha Market Variety",
-            "address": "369 Flavor Street",
-            "city": "Prague",
-            "geo_location": "50.0755,14.4378",
-            "tags": "variety,desserts,sweet treats,family friendly",
-            "noise_level": "moderate",
-            "seating_capacity": "large",
-            "specialties": "Signature Mochas, Hot Chocolate, Czech Pastries",
-            "price_range": "moderate",
-            "wifi": True,
-            "power_outlets": True,
-            "outdoor_seating": True,
-            "pet_friendly": True,
-            "opening_hours": "Monday-Sunday: 8:00-21:00",
-            "short_description": "A family-friendly Prague café specializing in decadent mochas and traditional Czech desserts.",
-            "rating": 4.4,
-            "img": "https://images.unsplash.com/photo-1445077100181-a33e9ac94db0"
-        },
-        {
-            "title": "Drip District Community",
-            "address": "741 Community Corner",
-            "city": "Budapest",
-            "geo_location": "47.4979,19.0402",
-            "tags": "community,events,social,local hangout",
-            "noise_level": "moderate",
-            "seating_capacity": "large",
-            "specialties": "Drip Coffee, Community Blends, Hungarian Pastries",
-            "price_range": "budget",
-            "wifi": True,
-            "power_outlets": True,
-            "outdoor_seating": True,
-            "pet_friendly": True,
-            "opening_hours": "Monday-Sunday: 7:00-22:00",
-            "short_description": "A community-centered Budapest café that hosts local events and serves neighborhood-roasted coffee.",
-            "rating": 4.7,
-            "img": "https://images.unsplash.com/photo-1521017432531-fbd92d768814"
-        }
-    ]
-
-    for i, cafe in enumerate(cafes_data):
+    for i, cafe in enumerate(CAFES_DATA):
         name = cafe["title"]
-        slug = name.lower().replace("&", "and").replace(" ", "-").replace("é", "e").replace("ü", "u").replace("ä", "a").replace("ö", "o")
+        slug = cafe_slugs[i]
 
         # Generate opening hours as richtext
         opening_hours_content = {
@@ -471,6 +578,7 @@ def main():
                 "city": cafe["city"],
                 "geo_location": cafe["geo_location"],
                 "opening_hours": opening_hours_content,
+                "timezone": CITY_TIMEZONES[cafe["city"]],
 
                 # Amenities & Features
                 "wifi": cafe["wifi"],
@@ -503,7 +611,7 @@ def main():
                     "ai_summary": f"A {cafe['price_range']}-range {cafe['noise_level']} café in {cafe['city']} perfect for {cafe['tags'].split(',')[0]} enthusiasts",
                     "ai_tags": f"{cafe['city']},{cafe['noise_level']},{cafe['price_range']},{'wifi' if cafe['wifi'] else 'no-wifi'},{'pet-friendly' if cafe['pet_friendly'] else 'no-pets'}",
                     "detected_language": "en",
-                    "open_now": i % 2 == 0  # Alternate open/closed for demo
+                    "open_now": open_now_state(cafe["opening_hours"], CITY_TIMEZONES[cafe["city"]])[0] is True
                 }]
             }]
         }
@@ -511,31 +619,7 @@ def main():
 
     # 4) Demo events
     print("Creating events…")
-    events = [
-        {
-            "title": "Latte Art Workshop",
-            "slug": "latte-art-workshop",
-            "date": "2025-10-01T18:00:00+00:00",
-            "location": "Amsterdam, NL",
-            "img": "https://images.unsplash.com/photo-1522992319-0365e5f11656"
-        },
-        {
-            "title": "Coffee Cupping Night",
-            "slug": "coffee-cupping-night",
-            "date": "2025-10-08T18:00:00+00:00",
-            "location": "Berlin, DE",
-            "img": "https://images.unsplash.com/photo-1512568400610-62da28bc8a13"
-        },
-        {
-            "title": "Roaster Talk",
-            "slug": "roaster-talk",
-            "date": "2025-10-15T18:00:00+00:00",
-            "location": "Paris, FR",
-            "img": "https://images.unsplash.com/photo-1494415859740-21e878dd929d"
-        }
-    ]
-
-    for idx, e in enumerate(events):
+    for idx, e in enumerate(EVENTS):
         content = {
             "component": "page",
             "_uid": f"event-page-{idx}",
@@ -561,4 +645,9 @@ def main():
     print("Seed complete: components, folders, 10 cafes, 3 events.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if len(sys.argv) > 1 and sys.argv[1] == "reconcile":
+        reconcile(dry_run="--dry-run" in sys.argv[2:], delete_orphans="--delete-orphans" in sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] == "refresh-open-now":
+        refresh_open_now_flags(watch="--watch" in sys.argv[2:])
+    else:
+        main()
\ No newline at end of file
@@ -0,0 +1,281 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+
+class OutboundRequest(NamedTuple):
+    """One HTTP call a target wants to make for an event."""
+    method: str
+    url: str
+    json: Any = None
+    headers: Optional[Dict[str, str]] = None
+
+
+def story_paths(event: Dict[str, Any]) -> List[str]:
+    """
+    Work out which Next.js routes render the story in ``event``.
+
+    Uses the record/story content type when the payload carries it;
+    otherwise both detail routes are returned since the webhook only has
+    the slug.
+    """
+    slug = (event.get("full_slug") or "").rsplit("/", 1)[-1]
+    if not slug:
+        return []
+    record_type = (event.get("record") or {}).get("type")
+    if record_type in ("cafe", "event"):
+        return [f"/{record_type}/{slug}"]
+    story = event.get("story") or {}
+    body = (story.get("content") or {}).get("body") or []
+    components = {blok.get("component") for blok in body if isinstance(blok, dict)}
+    if "cafe" in components:
+        return [f"/cafe/{slug}"]
+    if "event" in components:
+        return [f"/event/{slug}"]
+    return [f"/cafe/{slug}", f"/event/{slug}"]
+
+
+class DispatchTarget(ABC):
+    """
+    A downstream system notified about verified story events.
+
+    Subclasses turn an event into zero or more outbound requests; the
+    dispatcher handles pooling, concurrency, retries and dead-lettering.
+    """
+
+    def __init__(self, name: str, concurrency: int = 4, max_attempts: int = 5,
+                 backoff_base: float = 0.5, backoff_max: float = 30.0, timeout: float = 10.0,
+                 queue_size: int = 1000):
+        if concurrency <= 0 or max_attempts <= 0:
+            raise ValueError("concurrency and max_attempts must be positive")
+        self.name = name
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.queue_size = queue_size
+
+    @abstractmethod
+    def build_requests(self, event: Dict[str, Any]) -> List[OutboundRequest]:
+        """Turn a story event into the outbound requests this target needs."""
+
+
+class SearchReindexTarget(DispatchTarget):
+    """Asks the search indexer to re-sync one story, sending the normalized record when known."""
+
+    def __init__(self, url: str, **kwargs):
+        super().__init__("search-reindex", **kwargs)
+        self.url = url
+
+    def build_requests(self, event: Dict[str, Any]) -> List[OutboundRequest]:
+        body = {
+            "action": event.get("action"),
+            "story_id": event.get("story_id"),
+            "full_slug": event.get("full_slug"),
+        }
+        if event.get("record"):
+            body["record"] = event["record"]
+        return [OutboundRequest("POST", self.url, json=body)]
+
+
+class RevalidateTarget(DispatchTarget):
+    """Triggers Next.js on-demand revalidation of /cafe/[slug] and /event/[slug]."""
+
+    def __init__(self, url: str, secret: Optional[str] = None, **kwargs):
+        super().__init__("next-revalidate", **kwargs)
+        self.url = url
+        self.secret = secret
+
+    def build_requests(self, event: Dict[str, Any]) -> List[OutboundRequest]:
+        headers = {"x-revalidate-secret": self.secret} if self.secret else None
+        return [OutboundRequest("POST", self.url, json={"path": path}, headers=headers)
+                for path in story_paths(event)]
+
+
+class CdnPurgeTarget(DispatchTarget):
+    """Purges the story's public URLs from the CDN."""
+
+    def __init__(self, url: str, site_url: str, token: Optional[str] = None, **kwargs):
+        super().__init__("cdn-purge", **kwargs)
+        self.url = url
+        self.site_url = site_url.rstrip("/")
+        self.token = token
+
+    def build_requests(self, event: Dict[str, Any]) -> List[OutboundRequest]:
+        paths = story_paths(event)
+        if not paths:
+            return []
+        headers = {"Authorization": f"Bearer {self.token}"} if self.token else None
+        return [OutboundRequest("POST", self.url, json={"files": [self.site_url + path for path in paths]},
+                                headers=headers)]
+
+
+class _TargetRunner:
+    """Queue, worker tasks and HTTP pool belonging to a single target."""
+
+    def __init__(self, target: DispatchTarget, dead_letter_path: str):
+        self.target = target
+        self.dead_letter_path = dead_letter_path
+        self.queue: "asyncio.Queue[OutboundRequest]" = asyncio.Queue(maxsize=target.queue_size)
+        self.client = httpx.AsyncClient(
+            timeout=target.timeout,
+            limits=httpx.Limits(max_connections=target.concurrency,
+                                max_keepalive_connections=target.concurrency),
+        )
+        self.workers = [asyncio.create_task(self._work()) for _ in range(target.concurrency)]
+        # Dead-letter records are written by their own task, off the event loop
+        self.dead_letters: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+        self.dead_letter_writer = asyncio.create_task(self._write_dead_letters())
+        self.delivered = 0
+        self.dead_lettered = 0
+
+    def submit(self, request: OutboundRequest):
+        try:
+            self.queue.put_nowait(request)
+        except asyncio.QueueFull:
+            self._dead_letter(request, "queue full", attempts=0)
+
+    async def _work(self):
+        while True:
+            request = await self.queue.get()
+            try:
+                await self._deliver(request)
+            except Exception as e:  # never let one bad request kill the worker
+                self._dead_letter(request, f"unexpected error: {e}", attempts=0)
+            finally:
+                self.queue.task_done()
+
+    async def _deliver(self, request: OutboundRequest):
+        target = self.target
+        reason = ""
+        for attempt in range(1, target.max_attempts + 1):
+            try:
+                response = await self.client.request(request.method, request.url,
+                                                     json=request.json, headers=request.headers)
+                if response.status_code < 400:
+                    self.delivered += 1
+                    return
+                reason = f"HTTP {response.status_code}"
+                if response.status_code not in RETRYABLE_STATUS:
+                    break
+            except httpx.HTTPError as e:
+                reason = f"{type(e).__name__}: {e}"
+            if attempt < target.max_attempts:
+                delay = min(target.backoff_max, target.backoff_base * 2 ** (attempt - 1))
+                await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+        self._dead_letter(request, reason, attempts=attempt)
+
+    def _dead_letter(self, request: OutboundRequest, reason: str, attempts: int):
+        self.dead_lettered += 1
+        logger.warning(f"Dispatch to {self.target.name} failed after {attempts} attempts: {reason}")
+        record = {"target": self.target.name, "time": time.time(), "reason": reason,
+                  "attempts": attempts, "request": request._asdict()}
+        self.dead_letters.put_nowait(record)
+
+    async def _write_dead_letters(self):
+        while True:
+            records = [await self.dead_letters.get()]
+            while not self.dead_letters.empty():
+                records.append(self.dead_letters.get_nowait())
+            try:
+                await asyncio.to_thread(self._append_dead_letters, records)
+            except Exception as e:
+                logger.error(f"Could not write {len(records)} dead letters for {self.target.name}: {e}")
+            finally:
+                for _ in records:
+                    self.dead_letters.task_done()
+
+    def _append_dead_letters(self, records: List[Dict[str, Any]]):
+        with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+            f.writelines(json.dumps(record) + "\n" for record in records)
+
+    async def close(self, timeout: float):
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Dispatch to {self.target.name} still had {self.queue.qsize()} queued on shutdown")
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        # Anything still queued after the drain timeout is kept for replay
+        while not self.queue.empty():
+            self._dead_letter(self.queue.get_nowait(), "shutdown", attempts=0)
+        await self.dead_letters.join()
+        self.dead_letter_writer.cancel()
+        await asyncio.gather(self.dead_letter_writer, return_exceptions=True)
+        await self.client.aclose()
+
+
+class FanoutDispatcher:
+    """
+    Fans verified story events out to independent downstream targets.
+
+    Every target has its own bounded queue, worker tasks (its concurrency
+    limit) and pooled HTTP client, so a slow or failing target never holds
+    up the others or the webhook request. Requests that exhaust their retries
+    are appended to ``<dead_letter_dir>/<target>.jsonl``.
+    """
+
+    def __init__(self, targets: List[DispatchTarget], dead_letter_dir: str = "dead_letters"):
+        self.targets = targets
+        self.dead_letter_dir = dead_letter_dir
+        self._runners: Dict[str, _TargetRunner] = {}
+
+    @property
+    def running(self) -> bool:
+        return bool(self._runners)
+
+    async def start(self):
+        """Start worker tasks; must be called from the serving event loop."""
+        if self.running:
+            return
+        os.makedirs(self.dead_letter_dir, exist_ok=True)
+        for target in self.targets:
+            path = os.path.join(self.dead_letter_dir, f"{target.name}.jsonl")
+            self._runners[target.name] = _TargetRunner(target, path)
+
+    def dispatch(self, event: Dict[str, Any]) -> int:
+        """
+        Queue an event for every target without waiting on any of them.
+
+        Returns:
+            int: Number of outbound requests queued
+        """
+        if not self.running:
+            logger.warning("Dispatcher not started; dropping event")
+            return 0
+        queued = 0
+        for runner in self._runners.values():
+            for request in runner.target.build_requests(event):
+                runner.submit(request)
+                queued += 1
+        return queued
+
+    async def drain(self):
+        """Wait until every queued request has been delivered or written to its dead-letter file."""
+        await asyncio.gather(*(runner.queue.join() for runner in self._runners.values()))
+        await asyncio.gather(*(runner.dead_letters.join() for runner in self._runners.values()))
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            name: {"queued": runner.queue.qsize(), "delivered": runner.delivered,
+                   "dead_lettered": runner.dead_lettered}
+            for name, runner in self._runners.items()
+        }
+
+    async def stop(self, timeout: float = 10.0):
+        """Drain queues for up to ``timeout`` seconds, then shut everything down."""
+        runners, self._runners = list(self._runners.values()), {}
+        await asyncio.gather(*(runner.close(timeout) for runner in runners))
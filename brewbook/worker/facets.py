@@ -0,0 +1,173 @@
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+BOOLEAN_FACETS = ("wifi", "power_outlets", "outdoor_seating", "pet_friendly")
+OPTION_FACETS = ("noise_level", "seating_capacity", "price_range")
+FACET_FIELDS = BOOLEAN_FACETS + OPTION_FACETS
+
+
+def _popcount(bitmap: int) -> int:
+    return bin(bitmap).count("1")
+
+
+def facet_values(cafe: Mapping[str, Any]) -> Dict[str, str]:
+    """
+    Extract facet values from a cafe record (or raw blok) as strings.
+
+    Booleans become "true"/"false" (missing counts as false, matching the
+    search records); empty option fields are left out.
+    """
+    values = {field: "true" if cafe.get(field) is True else "false" for field in BOOLEAN_FACETS}
+    for field in OPTION_FACETS:
+        value = cafe.get(field)
+        if value:
+            values[field] = str(value)
+    return values
+
+
+class FacetIndex:
+    """
+    Per-value bitmap index over café amenity and option fields.
+
+    Each café owns one bit position (freed positions are reused so bitmaps
+    stay as narrow as the live set). Every (field, value) pair keeps an int
+    bitmap of the cafés carrying it, so filters are AND/OR over ints and
+    facet counts are popcounts.
+    """
+
+    def __init__(self, fields: Iterable[str] = FACET_FIELDS):
+        self.fields = tuple(fields)
+        self._bitmaps: Dict[str, Dict[str, int]] = {field: {} for field in self.fields}
+        self._rows: Dict[Any, int] = {}
+        self._keys: List[Any] = []
+        self._slugs: List[Optional[str]] = []
+        self._values: List[Optional[Dict[str, str]]] = []
+        self._free: List[int] = []
+        self._live = 0
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._rows
+
+    # ---------- Writes ----------
+    def upsert(self, key: Any, values: Mapping[str, str], slug: Optional[str] = None):
+        """Index a café from a {field: value} mapping."""
+        row = self._rows.get(key)
+        if row is None:
+            if self._free:
+                row = self._free.pop()
+            else:
+                row = len(self._keys)
+                self._keys.append(None)
+                self._slugs.append(None)
+                self._values.append(None)
+            self._rows[key] = row
+            self._keys[row] = key
+        else:
+            self._clear_row(row)
+
+        bit = 1 << row
+        kept = {}
+        for field in self.fields:
+            value = values.get(field)
+            if value is None:
+                continue
+            field_bitmaps = self._bitmaps[field]
+            field_bitmaps[value] = field_bitmaps.get(value, 0) | bit
+            kept[field] = value
+        self._values[row] = kept
+        self._slugs[row] = slug
+        self._live |= bit
+
+    def upsert_record(self, record: Dict[str, Any]) -> bool:
+        """
+        Index a normalized café record's facet fields.
+
+        Returns:
+            bool: True if the record was indexed, False if it was skipped
+        """
+        if record.get("type") != "cafe":
+            self.remove(record.get("storyId"))
+            return False
+        self.upsert(record["storyId"], facet_values(record), slug=record.get("slug"))
+        return True
+
+    def remove(self, key: Any) -> bool:
+        """Drop a café from the index."""
+        row = self._rows.pop(key, None)
+        if row is None:
+            return False
+        self._clear_row(row)
+        self._keys[row] = None
+        self._slugs[row] = None
+        self._values[row] = None
+        self._live &= ~(1 << row)
+        self._free.append(row)
+        return True
+
+    def _clear_row(self, row: int):
+        mask = ~(1 << row)
+        for field, value in (self._values[row] or {}).items():
+            field_bitmaps = self._bitmaps[field]
+            remaining = field_bitmaps[value] & mask
+            if remaining:
+                field_bitmaps[value] = remaining
+            else:
+                del field_bitmaps[value]
+
+    # ---------- Queries ----------
+    def match(self, filters: Mapping[str, Iterable[str]], skip: Optional[str] = None) -> int:
+        """
+        Return the bitmap of cafés matching ``filters``.
+
+        Values within a field are ORed, fields are ANDed. Unknown fields
+        are ignored; ``skip`` leaves one field out (for disjunctive counts).
+        """
+        result = self._live
+        for field, values in filters.items():
+            if field == skip or field not in self._bitmaps:
+                continue
+            field_bitmaps = self._bitmaps[field]
+            union = 0
+            for value in values:
+                union |= field_bitmaps.get(value, 0)
+            result &= union
+        return result
+
+    def facet_counts(self, filters: Optional[Mapping[str, Iterable[str]]] = None) -> Dict[str, Dict[str, int]]:
+        """
+        Count cafés per facet value under ``filters``.
+
+        Counts for a filtered field ignore that field's own filter so every
+        option stays selectable, like hosted disjunctive faceting.
+        """
+        filters = filters or {}
+        base = self.match(filters)
+        counts = {}
+        for field, field_bitmaps in self._bitmaps.items():
+            scope = self.match(filters, skip=field) if field in filters else base
+            counts[field] = {
+                value: count
+                for value, count in ((value, _popcount(bitmap & scope)) for value, bitmap in field_bitmaps.items())
+                if count
+            }
+        return counts
+
+    def search(self, filters: Optional[Mapping[str, Iterable[str]]] = None, limit: int = 100) -> Dict[str, Any]:
+        """
+        Filter cafés and compute facet counts in one call.
+
+        Returns:
+            Dict with "nbHits", "hits" ({"id", "slug"} dicts, up to ``limit``) and "facets"
+        """
+        filters = filters or {}
+        bitmap = self.match(filters)
+        hits = []
+        remaining = bitmap
+        while remaining and len(hits) < limit:
+            low = remaining & -remaining
+            row = low.bit_length() - 1
+            hits.append({"id": self._keys[row], "slug": self._slugs[row]})
+            remaining ^= low
+        return {"nbHits": _popcount(bitmap), "hits": hits, "facets": self.facet_counts(filters)}
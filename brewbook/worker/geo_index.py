@@ -0,0 +1,396 @@
+import heapq
+import math
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+EARTH_RADIUS_KM = 6371.0088
+HALF_CIRCUMFERENCE_KM = math.pi * EARTH_RADIUS_KM
+
+# Grid cells per side of a coarse block, used to prune far-away k-nearest searches
+COARSE_CELLS = 16
+
+
+def parse_geo_location(value: Any) -> Optional[Tuple[float, float]]:
+    """
+    Parse a Storyblok "lat,lng" string into a coordinate pair.
+
+    Returns:
+        Tuple of (lat, lng) in degrees, or None if the value is missing or invalid
+    """
+    if not isinstance(value, str) or "," not in value:
+        return None
+    lat_text, lng_text = value.split(",", 1)
+    try:
+        lat, lng = float(lat_text), float(lng_text)
+    except ValueError:
+        return None
+    if not (-90.0 <= lat <= 90.0 and -180.0 <= lng <= 180.0):
+        return None
+    return lat, lng
+
+
+class GeoIndex:
+    """
+    Compact in-memory index of café coordinates.
+
+    Coordinates are stored column-wise in ``array('d')`` buffers (radians plus a
+    precomputed cosine of the latitude) and bucketed into a fixed lat/lng grid.
+    Radius queries only compute haversine distances for points in grid cells
+    overlapping the query's bounding box. k-nearest queries visit grid cells
+    ring by ring outwards from the query's cell, keeping the best k in a
+    bounded heap, and stop once nothing beyond the visited rings can be
+    closer than the k-th hit. Queries far from every café instead visit the
+    occupied cells nearest first, pruning whole blocks of ``COARSE_CELLS``
+    cells by their distance from the query.
+    """
+
+    def __init__(self, cell_degrees: float = 0.25):
+        if cell_degrees <= 0:
+            raise ValueError("cell_degrees must be positive")
+        self.cell_degrees = cell_degrees
+        self._columns = int(math.ceil(360.0 / cell_degrees))
+        self._last_row = self._row_of(90.0)
+        self._coarse_columns = -(-self._columns // COARSE_CELLS)
+        self._lat = array("d")
+        self._lng = array("d")
+        self._cos_lat = array("d")
+        self._cells = array("q")
+        self._ids: List[Any] = []
+        self._slugs: List[Optional[str]] = []
+        self._rows: Dict[Any, int] = {}
+        self._grid: Dict[int, Set[int]] = {}
+        self._coarse: Dict[int, Set[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, story_id: Any) -> bool:
+        return story_id in self._rows
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]], **kwargs) -> "GeoIndex":
+        """Build an index from normalized search records (seed data or API results)."""
+        index = cls(**kwargs)
+        for record in records:
+            index.upsert_record(record)
+        return index
+
+    # ---------- Writes ----------
+    def upsert(self, story_id: Any, lat: float, lng: float, slug: Optional[str] = None):
+        """Insert or move a café."""
+        cell = self._cell_key(lat, lng)
+        lat_rad, lng_rad = math.radians(lat), math.radians(lng)
+        row = self._rows.get(story_id)
+        if row is None:
+            row = len(self._ids)
+            self._rows[story_id] = row
+            self._ids.append(story_id)
+            self._slugs.append(slug)
+            self._lat.append(lat_rad)
+            self._lng.append(lng_rad)
+            self._cos_lat.append(math.cos(lat_rad))
+            self._cells.append(cell)
+        else:
+            self._unlink(self._cells[row], row)
+            self._slugs[row] = slug
+            self._lat[row] = lat_rad
+            self._lng[row] = lng_rad
+            self._cos_lat[row] = math.cos(lat_rad)
+            self._cells[row] = cell
+        self._link(cell, row)
+
+    def upsert_record(self, record: Dict[str, Any]) -> bool:
+        """
+        Index a normalized record if it is a café with a valid geo_location.
+
+        Returns:
+            bool: True if the record was indexed, False if it was skipped
+        """
+        geoloc = record.get("_geoloc")
+        if record.get("type") != "cafe" or not geoloc:
+            self.remove(record.get("storyId"))
+            return False
+        self.upsert(record["storyId"], geoloc["lat"], geoloc["lng"], slug=record.get("slug"))
+        return True
+
+    def remove(self, story_id: Any) -> bool:
+        """Remove a café; the last row is moved into the freed slot."""
+        row = self._rows.pop(story_id, None)
+        if row is None:
+            return False
+        self._unlink(self._cells[row], row)
+        last = len(self._ids) - 1
+        if row != last:
+            last_cell = self._cells[last]
+            self._unlink(last_cell, last)
+            self._link(last_cell, row)
+            for column in (self._lat, self._lng, self._cos_lat, self._cells):
+                column[row] = column[last]
+            self._ids[row] = self._ids[last]
+            self._slugs[row] = self._slugs[last]
+            self._rows[self._ids[row]] = row
+        for column in (self._lat, self._lng, self._cos_lat, self._cells):
+            column.pop()
+        self._ids.pop()
+        self._slugs.pop()
+        return True
+
+    def _link(self, cell: int, row: int):
+        members = self._grid.get(cell)
+        if members is None:
+            members = self._grid[cell] = set()
+            self._coarse.setdefault(self._coarse_key(cell), set()).add(cell)
+        members.add(row)
+
+    def _unlink(self, cell: int, row: int):
+        members = self._grid[cell]
+        members.discard(row)
+        if not members:
+            del self._grid[cell]
+            coarse = self._coarse_key(cell)
+            self._coarse[coarse].discard(cell)
+            if not self._coarse[coarse]:
+                del self._coarse[coarse]
+
+    # ---------- Queries ----------
+    def within(self, lat: float, lng: float, radius_km: float, k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Find all cafés within ``radius_km`` of a point, nearest first.
+
+        Args:
+            k: Return at most this many (the nearest); the search then stops
+                early instead of ranking every café in the radius
+
+        Returns:
+            List of {"id", "slug", "distance_km"} dicts
+        """
+        if k is not None:
+            return self.nearest(lat, lng, k, max_km=radius_km)
+        hits = self._within(lat, lng, radius_km)
+        hits.sort()
+        return [self._hit(row, distance) for distance, row in hits]
+
+    def nearest(self, lat: float, lng: float, k: int = 10, max_km: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Find the ``k`` cafés closest to a point, nearest first.
+
+        Args:
+            max_km: Ignore cafés further away than this
+
+        Returns:
+            List of {"id", "slug", "distance_km"} dicts
+        """
+        if k <= 0 or not self._ids:
+            return []
+        lat1, lng1 = math.radians(lat), math.radians(lng)
+        cos1 = math.cos(lat1)
+        lats, lngs, coss, grid = self._lat, self._lng, self._cos_lat, self._grid
+        sin = math.sin
+        # Distances stay in haversine space (monotonic in km) until the end
+        limit = sin(min(max_km / EARTH_RADIUS_KM, math.pi) / 2) ** 2 if max_km is not None else 1.0
+        best: List[Tuple[float, int]] = []  # max-heap of (-a, row)
+
+        def scan(cell: int):
+            for row in grid.get(cell, ()):
+                a = sin((lats[row] - lat1) / 2) ** 2 + cos1 * coss[row] * sin((lngs[row] - lng1) / 2) ** 2
+                if a > limit:
+                    continue
+                if len(best) < k:
+                    heapq.heappush(best, (-a, row))
+                elif a < -best[0][0]:
+                    heapq.heapreplace(best, (-a, row))
+
+        def done(bound: float) -> bool:
+            return bound > limit or (len(best) == k and bound >= -best[0][0])
+
+        # Nearby: walk rings of cells outwards from the query's cell
+        row0, col0 = self._row_of(lat), self._col_of(lng)
+        # Walking stops after visiting as many cells as are occupied (at most
+        # 1024); past that the best-first pass below is cheaper
+        ring, budget = 0, min(len(grid), 1024)
+        while ring <= self._max_ring(row0) and budget > 0:
+            cells = self._ring_cells(row0, col0, ring)
+            budget -= len(cells)
+            for cell in cells:
+                scan(cell)
+            if done(self._beyond_ring(lat, lng, cos1, row0, col0, ring)):
+                return self._ranked(best)
+            ring += 1
+
+        # Far from everything: visit the remaining occupied cells best-first,
+        # expanding coarse blocks into their cells only when they come up
+        pending = [(self._block_bound(lat, lng, cos1, block, COARSE_CELLS), block, True) for block in self._coarse]
+        heapq.heapify(pending)
+        while pending:
+            bound, key, is_block = heapq.heappop(pending)
+            if done(bound):
+                break
+            if is_block:
+                for cell in self._coarse[key]:
+                    if self._ring_of(cell, row0, col0) >= ring:
+                        heapq.heappush(pending, (self._block_bound(lat, lng, cos1, cell, 1), cell, False))
+            else:
+                scan(key)
+        return self._ranked(best)
+
+    def _ranked(self, best: List[Tuple[float, int]]) -> List[Dict[str, Any]]:
+        best.sort(reverse=True)
+        return [self._hit(row, 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(1.0, -a)))) for a, row in best]
+
+    def _max_ring(self, row0: int) -> int:
+        return max(row0, self._last_row - row0, self._columns // 2)
+
+    def _ring_of(self, cell: int, row0: int, col0: int) -> int:
+        cell_row, cell_col = divmod(cell, self._columns)
+        col_gap = abs(cell_col - col0)
+        return max(abs(cell_row - row0), min(col_gap, self._columns - col_gap))
+
+    def _ring_cells(self, row0: int, col0: int, ring: int) -> List[int]:
+        """Cell keys exactly ``ring`` cells (Chebyshev, wrapping in longitude) from the query's cell."""
+        columns = self._columns
+        if 2 * ring + 1 >= columns:
+            edge_cols: Iterable[int] = range(columns)
+        else:
+            edge_cols = [(col0 + offset) % columns for offset in range(-ring, ring + 1)]
+        side_cols = {(col0 - ring) % columns, (col0 + ring) % columns} if ring <= columns // 2 else set()
+        cells = []
+        for cell_row in range(max(0, row0 - ring), min(self._last_row, row0 + ring) + 1):
+            base = cell_row * columns
+            cols = edge_cols if abs(cell_row - row0) == ring else side_cols
+            cells.extend(base + col for col in cols)
+        return cells
+
+    @staticmethod
+    def _gap_bound(cos1: float, lat: float, lat_gap: float, lng_gap: float) -> float:
+        """
+        Lower bound (in haversine space) on the distance from a point at
+        ``lat`` to any point at least ``lat_gap`` degrees away in latitude
+        or at least ``lng_gap`` degrees away in longitude.
+        """
+        lat_part = math.sin(math.radians(lat_gap) / 2) ** 2
+        lng_gap = math.radians(min(lng_gap, 180.0))
+        # Distance to the nearest point on the meridian lng_gap away (a pole past 90°)
+        if lng_gap <= math.pi / 2:
+            cross = math.asin(min(1.0, cos1 * math.sin(lng_gap)))
+        else:
+            cross = math.pi / 2 - abs(math.radians(lat))
+        return max(lat_part, math.sin(cross / 2) ** 2)
+
+    def _beyond_ring(self, lat: float, lng: float, cos1: float, row0: int, col0: int, ring: int) -> float:
+        """Lower bound on the distance to anything outside the cells within ``ring`` of the query's cell."""
+        cell = self.cell_degrees
+        south = (row0 - ring) * cell - 90.0
+        north = (row0 + ring + 1) * cell - 90.0
+        bounds = []
+        # Rows outside the ring are at least the latitude gap away
+        if south > -90.0 or north < 90.0:
+            gap = min(lat - south if south > -90.0 else math.inf, north - lat if north < 90.0 else math.inf)
+            bounds.append(self._gap_bound(cos1, lat, gap, 0.0))
+        # Columns outside the ring are at least the longitude gap away
+        if 2 * ring + 1 < self._columns:
+            west = (col0 - ring) * cell - 180.0
+            east = (col0 + ring + 1) * cell - 180.0
+            # The last column overhangs 180° when cell_degrees does not divide 360
+            gap = max(0.0, min(lng - west, east - lng, 180.0) - (self._columns * cell - 360.0))
+            bounds.append(self._gap_bound(cos1, lat, 0.0, gap))
+        return min(bounds) if bounds else math.inf
+
+    def _block_bound(self, lat: float, lng: float, cos1: float, key: int, size: int) -> float:
+        """
+        Distance (in haversine space) from the query to the nearest point of a
+        block of ``size`` x ``size`` grid cells (1 for a single cell).
+        """
+        span = self.cell_degrees * size
+        block_row, block_col = divmod(key, self._coarse_columns if size > 1 else self._columns)
+        south = block_row * span - 90.0
+        north = min(90.0, south + span)
+        west = block_col * span - 180.0
+        width = min(span, 180.0 - west)
+        offset = (lng - west) % 360.0
+        if offset <= width:
+            return math.sin(math.radians(max(0.0, south - lat, lat - north)) / 2) ** 2
+        # Outside the block's longitudes the nearest point is on its nearer meridian edge
+        lng_gap = math.radians(min(offset - width, 360.0 - offset))
+        lat1 = math.radians(lat)
+        sin, cos = math.sin, math.cos
+        # Foot of the perpendicular from the query to that meridian, if the edge reaches it
+        if lng_gap <= math.pi / 2:
+            foot = math.degrees(math.atan2(sin(lat1), cos1 * cos(lng_gap)))
+            if south <= foot <= north:
+                return sin(math.asin(min(1.0, cos1 * sin(lng_gap))) / 2) ** 2
+        # Otherwise the distance along the edge is smallest at one of its corners
+        hav_gap = sin(lng_gap / 2) ** 2
+        return min(sin((math.radians(edge) - lat1) / 2) ** 2 + cos1 * cos(math.radians(edge)) * hav_gap
+                   for edge in (south, north))
+
+    def _within(self, lat: float, lng: float, radius_km: float) -> List[Tuple[float, int]]:
+        rows = self._candidate_rows(lat, lng, radius_km)
+        lat1 = math.radians(lat)
+        lng1 = math.radians(lng)
+        cos1 = math.cos(lat1)
+        lats, lngs, coss = self._lat, self._lng, self._cos_lat
+        sin, asin, sqrt, fmin = math.sin, math.asin, math.sqrt, min
+        # Compare in haversine space; only convert survivors to kilometres
+        limit = sin(fmin(radius_km / EARTH_RADIUS_KM, math.pi) / 2) ** 2
+        hits = []
+        for row in rows:
+            a = sin((lats[row] - lat1) / 2) ** 2 + cos1 * coss[row] * sin((lngs[row] - lng1) / 2) ** 2
+            if a <= limit:
+                hits.append((2 * EARTH_RADIUS_KM * asin(sqrt(fmin(1.0, a))), row))
+        return hits
+
+    def _candidate_rows(self, lat: float, lng: float, radius_km: float) -> Iterable[int]:
+        if radius_km >= HALF_CIRCUMFERENCE_KM:
+            return range(len(self._ids))
+        angular = radius_km / EARTH_RADIUS_KM
+        dlat = math.degrees(angular)
+        lat_min, lat_max = lat - dlat, lat + dlat
+        if lat_min <= -90.0 or lat_max >= 90.0:
+            lng_span = 360.0
+        else:
+            ratio = math.sin(angular) / math.cos(math.radians(lat))
+            lng_span = 360.0 if ratio >= 1.0 else 2 * math.degrees(math.asin(ratio))
+
+        row_min = self._row_of(max(lat_min, -90.0))
+        row_max = self._row_of(min(lat_max, 90.0))
+        if lng_span >= 360.0:
+            col_start, col_count = 0, self._columns
+        else:
+            west = int((lng - lng_span / 2 + 180.0) // self.cell_degrees)
+            east = int((lng + lng_span / 2 + 180.0) // self.cell_degrees)
+            col_start, col_count = west % self._columns, min(self._columns, east - west + 1)
+
+        # Scanning occupied cells is cheaper than enumerating a huge empty box
+        if (row_max - row_min + 1) * col_count > len(self._grid):
+            rows = []
+            for cell, members in self._grid.items():
+                cell_row, cell_col = divmod(cell, self._columns)
+                if row_min <= cell_row <= row_max and (cell_col - col_start) % self._columns < col_count:
+                    rows.extend(members)
+            return rows
+
+        rows = []
+        grid = self._grid
+        for cell_row in range(row_min, row_max + 1):
+            base = cell_row * self._columns
+            for offset in range(col_count):
+                members = grid.get(base + (col_start + offset) % self._columns)
+                if members:
+                    rows.extend(members)
+        return rows
+
+    def _row_of(self, lat: float) -> int:
+        return int((lat + 90.0) // self.cell_degrees)
+
+    def _col_of(self, lng: float) -> int:
+        return int((lng + 180.0) // self.cell_degrees) % self._columns
+
+    def _cell_key(self, lat: float, lng: float) -> int:
+        return self._row_of(lat) * self._columns + self._col_of(lng)
+
+    def _coarse_key(self, cell: int) -> int:
+        cell_row, cell_col = divmod(cell, self._columns)
+        return (cell_row // COARSE_CELLS) * self._coarse_columns + cell_col // COARSE_CELLS
+
+    def _hit(self, row: int, distance: float) -> Dict[str, Any]:
+        return {"id": self._ids[row], "slug": self._slugs[row], "distance_km": round(distance, 3)}
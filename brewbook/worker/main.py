@@ -1,11 +1,26 @@
+import asyncio
+import contextlib
 import logging
 import os
-from typing import Dict, Optional
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
 
-from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import JSONResponse
+from fastapi import BackgroundTasks, FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+from fastapi.concurrency import run_in_threadpool
 from dotenv import load_dotenv
+import httpx
 
+from dispatcher import CdnPurgeTarget, DispatchTarget, FanoutDispatcher, RevalidateTarget, SearchReindexTarget
+from facets import FacetIndex
+from geo_index import GeoIndex
+from normalizer import RecordNormalizer
+from opening_hours import OpeningHoursIndex
+from profiling import SamplingProfiler, StageHistograms, StageTimingMiddleware, stage
+from story_cache import StoryCache, StoryFetcher, etag_matches
+from traffic_capture import CaptureWriter
 from webhook_validator import WebhookValidator, WebhookLogger
 
 # Configure logging
@@ -14,10 +29,35 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
+logger = logging.getLogger(__name__)
+
 # Load environment variables
 load_dotenv()
 
-app = FastAPI(title="Brewbook Webhook Service", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Run the fan-out dispatcher and fill the café indexes from Storyblok; release
+    clients, the on-disk cache tier and any capture file on shutdown.
+    """
+    await dispatcher.start()
+    loader = asyncio.create_task(load_indexes()) if story_fetcher else None
+    yield
+    if loader:
+        loader.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await loader
+    await dispatcher.stop()
+    if story_fetcher:
+        await story_fetcher.close()
+    story_cache.close()
+    if capture_writer:
+        capture_writer.close()
+
+
+app = FastAPI(title="Brewbook Webhook Service", version="1.0.0", lifespan=lifespan)
+
 STORYBLOK_WEBHOOK_SECRET = os.getenv("STORYBLOK_WEBHOOK_SECRET")
 
 if not STORYBLOK_WEBHOOK_SECRET:
@@ -26,6 +66,65 @@ if not STORYBLOK_WEBHOOK_SECRET:
 # Initialize validator with secret
 validator = WebhookValidator(STORYBLOK_WEBHOOK_SECRET)
 
+# Opt-in diagnostics: per-stage timing (Server-Timing header + /debug/stages) and profiler
+STAGE_TIMING_ENABLED = os.getenv("ENABLE_STAGE_TIMING", "").lower() in ("1", "true", "yes")
+PROFILER_ENABLED = os.getenv("ENABLE_PROFILER", "").lower() in ("1", "true", "yes")
+stage_histograms = StageHistograms()
+if STAGE_TIMING_ENABLED:
+    app.add_middleware(StageTimingMiddleware, histograms=stage_histograms)
+profiler = SamplingProfiler()
+
+# In-memory café indexes, filled from the Content Delivery API at startup and kept
+# current by verified webhooks
+normalizer = RecordNormalizer()
+geo_index = GeoIndex()
+hours_index = OpeningHoursIndex()
+facet_index = FacetIndex()
+
+# Story content cache; misses are filled from the Content Delivery API when a token is set
+story_cache = StoryCache(
+    max_entries=int(os.getenv("STORY_CACHE_MAX_ENTRIES", "1000")),
+    max_bytes=int(os.getenv("STORY_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+    db_path=os.getenv("STORY_CACHE_DB") or None,
+    negative_ttl=float(os.getenv("STORY_CACHE_NEGATIVE_TTL", "30")),
+)
+STORYBLOK_TOKEN = os.getenv("STORYBLOK_TOKEN")
+story_fetcher = StoryFetcher(STORYBLOK_TOKEN) if STORYBLOK_TOKEN else None
+
+# Largest radius /cafes/nearby accepts
+MAX_NEARBY_RADIUS_KM = 1000.0
+
+REMOVAL_ACTIONS = {"unpublished", "deleted"}
+INVALIDATING_ACTIONS = {"published"} | REMOVAL_ACTIONS
+
+# Webhook events seen per story id; a background fetch or the startup load only
+# applies a story if no newer event for it arrived in the meantime
+story_event_counts: Dict[int, int] = {}
+
+
+def build_dispatch_targets() -> List[DispatchTarget]:
+    """Create downstream targets for every *_URL variable that is set."""
+    targets: List[DispatchTarget] = []
+    if os.getenv("SEARCH_REINDEX_URL"):
+        targets.append(SearchReindexTarget(os.environ["SEARCH_REINDEX_URL"]))
+    if os.getenv("NEXT_REVALIDATE_URL"):
+        targets.append(RevalidateTarget(os.environ["NEXT_REVALIDATE_URL"], secret=os.getenv("NEXT_REVALIDATE_SECRET")))
+    if os.getenv("CDN_PURGE_URL"):
+        targets.append(CdnPurgeTarget(os.environ["CDN_PURGE_URL"], site_url=os.getenv("SITE_URL", ""),
+                                      token=os.getenv("CDN_PURGE_TOKEN")))
+    return targets
+
+
+# Optional capture of verified webhook traffic for offline replay (see replay.py)
+WEBHOOK_CAPTURE_FILE = os.getenv("WEBHOOK_CAPTURE_FILE")
+capture_writer = CaptureWriter(WEBHOOK_CAPTURE_FILE) if WEBHOOK_CAPTURE_FILE else None
+
+# Downstream fan-out (search reindex, Next.js revalidation, CDN purge)
+dispatcher = FanoutDispatcher(
+    build_dispatch_targets(),
+    dead_letter_dir=os.getenv("DISPATCH_DEAD_LETTER_DIR", "dead_letters"),
+)
+
 
 def get_client_ip(request: Request) -> str:
     """Extract client IP address from request."""
@@ -35,8 +134,105 @@ def get_client_ip(request: Request) -> str:
     return request.client.host if request.client else "unknown"
 
 
+def index_story(story: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Normalize a story once and feed the record into the local café indexes."""
+    record = normalizer.normalize_story(story)
+    if record is None:
+        remove_from_indexes(story.get("id"))
+        return None
+    geo_index.upsert_record(record)
+    hours_index.upsert_record(record)
+    facet_index.upsert_record(record)
+    return record
+
+
+def remove_from_indexes(story_id: Any) -> None:
+    """Drop a story from every local café index."""
+    geo_index.remove(story_id)
+    hours_index.remove(story_id)
+    facet_index.remove(story_id)
+
+
+def is_story_with_content(story: Any) -> bool:
+    """Whether a payload's story can be cached and indexed (integer id and content blok)."""
+    return (isinstance(story, dict) and isinstance(story.get("id"), int)
+            and isinstance(story.get("content"), dict) and bool(story["content"]))
+
+
+def apply_story_event(payload: Dict[str, Any]) -> bool:
+    """
+    Update the story cache and café indexes and notify downstream targets.
+
+    Returns:
+        True if the event is a ``published`` event without story content that
+        must be completed by ``refresh_published_story`` (Storyblok webhooks
+        only carry the story id and slug)
+    """
+    action = payload.get("action")
+    story_id = payload.get("story_id")
+    story = payload.get("story")
+    record = None
+    if isinstance(story_id, int):
+        story_event_counts[story_id] = story_event_counts.get(story_id, 0) + 1
+    if action in INVALIDATING_ACTIONS:
+        story_cache.invalidate(story_id=story_id, slug=payload.get("full_slug"))
+        if story_fetcher:
+            story_fetcher.bump_cache_version()
+    if action in REMOVAL_ACTIONS:
+        remove_from_indexes(story_id)
+    elif is_story_with_content(story):
+        if action == "published":
+            story_cache.put(story)
+        record = index_story(story)
+    elif action == "published" and story_fetcher and isinstance(story_id, int):
+        return True
+    if action in INVALIDATING_ACTIONS and dispatcher.targets:
+        dispatcher.dispatch({**payload, "record": record} if record else payload)
+    return False
+
+
+async def refresh_published_story(payload: Dict[str, Any], seen: int) -> None:
+    """
+    Fetch a story announced by a bare ``published`` webhook, then cache, index
+    and dispatch it. Runs after the webhook response has been sent.
+
+    Args:
+        payload: The webhook payload
+        seen: ``story_event_counts`` for the story when the webhook was applied
+    """
+    story_id = payload["story_id"]
+    record = None
+    try:
+        story = await story_fetcher.fetch(story_id)
+    except httpx.HTTPError as e:
+        logger.warning(f"Could not fetch published story {story_id}: {e}")
+        story = None
+    if story_event_counts.get(story_id) != seen:
+        # A newer event for this story was applied while the fetch was running
+        return
+    if is_story_with_content(story):
+        story_cache.put(story)
+        record = index_story(story)
+    if dispatcher.targets:
+        dispatcher.dispatch({**payload, "record": record} if record else payload)
+
+
+async def load_indexes() -> None:
+    """Index every published story from the Content Delivery API, skipping stories webhooks already updated."""
+    indexed = 0
+    try:
+        async for story in story_fetcher.iter_stories():
+            if is_story_with_content(story) and story["id"] not in story_event_counts:
+                if index_story(story) is not None:
+                    indexed += 1
+    except httpx.HTTPError as e:
+        logger.warning(f"Loading café indexes from Storyblok failed after {indexed} stories: {e}")
+        return
+    logger.info(f"Loaded {indexed} cafés into the local indexes")
+
+
 @app.post("/webhooks/storyblok")
-async def handle_storyblok_webhook(request: Request) -> JSONResponse:
+async def handle_storyblok_webhook(request: Request, background_tasks: BackgroundTasks) -> JSONResponse:
     """
     Handle incoming Storyblok webhooks with signature validation.
     
@@ -46,12 +242,15 @@ async def handle_storyblok_webhook(request: Request) -> JSONResponse:
     Returns:
         200 OK with {"ok": true} for valid webhooks
         400 Bad Request with {"error": "message"} for invalid requests
+        500 Internal Server Error if a verified webhook could not be applied
     """
     client_ip = get_client_ip(request)
+    arrival = time.time()
     
     try:
         # Get the raw body for signature verification (must use raw bytes)
-        body = await request.body()
+        with stage("body"):
+            body = await request.body()
         
         # Get the signature from headers
         signature = request.headers.get("webhook-signature")
@@ -64,16 +263,23 @@ async def handle_storyblok_webhook(request: Request) -> JSONResponse:
             )
         
         # Verify the signature using our validator
-        if not validator.verify_signature(body, signature):
+        with stage("hmac"):
+            is_valid = validator.verify_signature(body, signature)
+        if not is_valid:
             WebhookLogger.log_verification_failure(client_ip, "Signature mismatch")
             return JSONResponse(
                 status_code=400,
                 content={"error": "Invalid signature"}
             )
         
+        if capture_writer:
+            with stage("capture"):
+                capture_writer.record(arrival, dict(request.headers), body)
+        
         # Parse the JSON payload after signature verification
         try:
-            payload = await request.json()
+            with stage("json"):
+                payload = await request.json()
             event_type = payload.get("action")
         except Exception:
             WebhookLogger.log_verification_failure(client_ip, "Invalid JSON payload")
@@ -83,13 +289,8 @@ async def handle_storyblok_webhook(request: Request) -> JSONResponse:
             )
         
         # Log successful verification with IP and event type
-        WebhookLogger.log_verification_success(client_ip, event_type)
-        
-        # Return success response as specified in requirements
-        return JSONResponse(
-            status_code=200,
-            content={"ok": True}
-        )
+        with stage("log"):
+            WebhookLogger.log_verification_success(client_ip, event_type)
         
     except Exception as e:
         WebhookLogger.log_verification_failure(client_ip, f"Unexpected error: {str(e)}")
@@ -97,6 +298,25 @@ async def handle_storyblok_webhook(request: Request) -> JSONResponse:
             status_code=400,
             content={"error": "Invalid signature"}
         )
+    
+    # The request is verified from here on; failures are ours, not the sender's
+    try:
+        with stage("apply"):
+            if apply_story_event(payload):
+                background_tasks.add_task(refresh_published_story, payload,
+                                          story_event_counts[payload["story_id"]])
+    except Exception as e:
+        WebhookLogger.log_processing_error(client_ip, event_type, e)
+        return JSONResponse(
+            status_code=500,
+            content={"error": "Webhook processing failed"}
+        )
+    
+    # Return success response as specified in requirements
+    return JSONResponse(
+        status_code=200,
+        content={"ok": True}
+    )
 
 
 @app.get("/")
@@ -111,6 +331,131 @@ async def health_check() -> Dict[str, str]:
     return {"status": "healthy", "service": "brewbook-webhook"}
 
 
+@app.get("/cafes/nearby")
+async def cafes_nearby(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    k: int = Query(10, ge=1, le=1000),
+    radius_km: Optional[float] = Query(None, gt=0, le=MAX_NEARBY_RADIUS_KM),
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Find cafés near a point.
+    
+    Returns the k nearest cafés, or the k nearest within radius_km when a
+    radius (at most 1000 km) is given.
+    """
+    if radius_km is not None:
+        hits = geo_index.within(lat, lng, radius_km, k=k)
+    else:
+        hits = geo_index.nearest(lat, lng, k)
+    return {"hits": hits}
+
+
+@app.get("/cafes/open")
+async def cafes_open(at: Optional[datetime] = None, limit: int = Query(100, ge=0, le=1000)) -> Dict[str, Any]:
+    """
+    List cafés open at a moment (defaults to now), each judged on its own timezone.
+    
+    An ``at`` with a UTC offset is converted into every café's local time; one
+    without an offset is taken as a café-local wall-clock time. Also returns
+    when the open set next changes so callers can refresh cached open_now
+    flags exactly when they flip.
+    """
+    moment = at or datetime.now(timezone.utc)
+    return {
+        "at": moment.isoformat(),
+        **hours_index.search(moment, limit=limit),
+        "next_change": hours_index.next_change(moment).isoformat(),
+    }
+
+
+@app.get("/cafes/facets")
+async def cafes_facets(request: Request, limit: int = Query(100, ge=0, le=1000)) -> Dict[str, Any]:
+    """
+    Filter cafés by amenity/option facets and return facet counts.
+    
+    Each facet field is a query parameter with comma-separated values,
+    e.g. ?wifi=true&noise_level=quiet,moderate (OR within a field, AND across fields).
+    Empty parameters such as ?wifi= do not filter.
+    """
+    filters = {}
+    for field in facet_index.fields:
+        values = [value for value in request.query_params.get(field, "").split(",") if value]
+        if values:
+            filters[field] = values
+    return facet_index.search(filters, limit=limit)
+
+
+@app.get("/stories/{key:path}")
+async def get_story(key: str, request: Request) -> Response:
+    """
+    Serve a published story by numeric id or full slug from the local cache.
+    
+    Misses are filled from Storyblok when STORYBLOK_TOKEN is configured.
+    Responses carry an ETag; a matching If-None-Match returns 304.
+    """
+    lookup = int(key) if key.isdigit() else key
+    entry = story_cache.get(lookup)
+    cache_status = "HIT"
+    if entry is None:
+        if story_cache.is_missing(lookup):
+            raise HTTPException(status_code=404, detail="Story not found")
+        try:
+            story = await story_fetcher.fetch(lookup) if story_fetcher else None
+        except httpx.HTTPError as e:
+            logger.warning(f"Storyblok fetch for {key} failed: {type(e).__name__}: {e}")
+            # Connection failures and timeouts are temporary; error responses are a bad gateway
+            unavailable = isinstance(e, httpx.TransportError)
+            raise HTTPException(status_code=503 if unavailable else 502,
+                                detail="Storyblok unavailable" if unavailable else "Storyblok request failed")
+        if story is None:
+            if story_fetcher:
+                story_cache.put_missing(lookup)
+            raise HTTPException(status_code=404, detail="Story not found")
+        entry = story_cache.put(story)
+        index_story(story)
+        cache_status = "MISS"
+
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache", "X-Cache": cache_status}
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+@app.get("/debug/stages")
+async def debug_stages() -> Dict[str, Any]:
+    """
+    Per-stage latency histograms (count, mean, p50/p90/p99 in ms) since startup.
+    
+    Disabled unless ENABLE_STAGE_TIMING is set.
+    """
+    if not STAGE_TIMING_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return stage_histograms.snapshot()
+
+
+@app.get("/debug/profile")
+async def debug_profile(
+    seconds: float = Query(10.0, gt=0, le=120),
+    interval_ms: float = Query(5.0, ge=1, le=1000),
+) -> PlainTextResponse:
+    """
+    Sample the live worker for N seconds and return collapsed stacks.
+    
+    Disabled unless ENABLE_PROFILER is set. The output feeds flamegraph.pl
+    or speedscope directly.
+    """
+    if not PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if profiler.busy:
+        raise HTTPException(status_code=409, detail="A profile capture is already running")
+    try:
+        stacks = await run_in_threadpool(profiler.capture, seconds, interval_ms / 1000.0)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(stacks)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,220 @@
+import logging
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from geo_index import parse_geo_location
+from opening_hours import open_now_state
+from richtext import richtext_to_text
+from schemas import COMPONENT_SCHEMAS
+
+logger = logging.getLogger(__name__)
+
+# Comma-separated text fields that become arrays in search records
+LIST_FIELDS = frozenset({"tags", "ai_tags"})
+
+# Top-level components that produce records; others (e.g. metadata) are nested only
+RECORD_COMPONENTS = ("cafe", "event")
+
+Converter = Callable[[Any], Any]
+FieldPlan = Tuple[Tuple[str, Converter], ...]
+
+
+def split_list(value: Any) -> List[str]:
+    """Split a comma-separated text field into trimmed, non-empty items."""
+    if isinstance(value, list):
+        return [str(item).strip() for item in value if str(item).strip()]
+    if not isinstance(value, str):
+        return []
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def _text(value: Any) -> str:
+    return value if isinstance(value, str) else ""
+
+
+def _boolean(value: Any) -> bool:
+    return value is True
+
+
+def _number(value: Any) -> Optional[float]:
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+
+def _asset(value: Any) -> Optional[str]:
+    return (value.get("filename") or None) if isinstance(value, dict) else None
+
+
+def _assets(value: Any) -> List[str]:
+    if not isinstance(value, list):
+        return []
+    return [item["filename"] for item in value if isinstance(item, dict) and item.get("filename")]
+
+
+def _raw(value: Any) -> Any:
+    return value
+
+
+def _converter_for(field: str, spec: Mapping[str, Any]) -> Optional[Converter]:
+    field_type = spec.get("type")
+    if field in LIST_FIELDS:
+        return split_list
+    if field_type == "richtext":
+        return richtext_to_text
+    if field_type in ("text", "option"):
+        return _text
+    if field_type == "boolean":
+        return _boolean
+    if field_type == "number":
+        return _number
+    if field_type == "asset":
+        return _assets if spec.get("multiple") else _asset
+    if field_type == "datetime":
+        return _raw
+    # bloks are handled structurally (metadata merge)
+    return None
+
+
+def create_summary(description: str, max_length: int = 150) -> str:
+    """Truncate a description for search result snippets (mirrors the Node normalizer)."""
+    if len(description) <= max_length:
+        return description
+    truncated = description[:max_length]
+    last_sentence = truncated.rfind(".")
+    if last_sentence > max_length * 0.7:
+        return truncated[:last_sentence + 1]
+    last_space = truncated.rfind(" ")
+    if last_space > max_length * 0.8:
+        return truncated[:last_space] + "..."
+    return truncated + "..."
+
+
+class RecordNormalizer:
+    """
+    Turns Storyblok page stories into flat search records.
+
+    Python counterpart of ``lib/services/RecordNormalizer.js``. Field plans
+    (field name + converter) are compiled once per component from the shared
+    schemas and cached, so normalizing a story is a single pass over the
+    blok's fields that reads values in place without copying the content.
+    """
+
+    def __init__(self, schemas: Mapping[str, Mapping[str, Any]] = COMPONENT_SCHEMAS,
+                 clock: Callable[[], datetime] = lambda: datetime.now(timezone.utc)):
+        self.schemas = schemas
+        self.clock = clock
+        self._plans: Dict[str, FieldPlan] = {}
+
+    def plan_for(self, component: str) -> FieldPlan:
+        """Return the compiled field plan for a component."""
+        plan = self._plans.get(component)
+        if plan is None:
+            plan = tuple(
+                (field, converter)
+                for field, spec in self.schemas.get(component, {}).items()
+                for converter in (_converter_for(field, spec),)
+                if converter is not None
+            )
+            self._plans[component] = plan
+        return plan
+
+    def normalize_story(self, story: Mapping[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Normalize a single story into a search record.
+
+        Returns:
+            The record, or None if the story has no id or no cafe/event blok
+        """
+        content = story.get("content")
+        if story.get("id") is None or not isinstance(content, dict):
+            return None
+        if content.get("component") in RECORD_COMPONENTS:
+            blok = content
+        else:
+            blok = next((b for b in content.get("body") or ()
+                         if isinstance(b, dict) and b.get("component") in RECORD_COMPONENTS), None)
+        if blok is None:
+            return None
+
+        component = blok["component"]
+        record: Dict[str, Any] = {
+            "objectID": f"story_{story.get('id')}",
+            "storyId": story.get("id"),
+            "slug": story.get("slug"),
+            "type": component,
+            "published_at": story.get("published_at"),
+            "created_at": story.get("created_at"),
+        }
+        for field, convert in self.plan_for(component):
+            record[field] = convert(blok.get(field))
+
+        if component == "cafe":
+            self._finish_cafe(record, blok)
+        else:
+            self._finish_event(record)
+        self._add_metadata(record, blok.get("metadata"))
+        if component == "cafe":
+            # Derived from the hours at café-local time; metadata is only a fallback
+            is_open, _ = open_now_state(record.get("opening_hours"), record.get("timezone"), self.clock())
+            if is_open is not None:
+                record["open_now"] = is_open
+        return record
+
+    def normalize_stories(self, stories: Iterable[Mapping[str, Any]]) -> List[Dict[str, Any]]:
+        """Normalize many stories, skipping ones without a record component."""
+        records = []
+        skipped = 0
+        for story in stories:
+            try:
+                record = self.normalize_story(story)
+            except Exception as e:
+                logger.error(f"Failed to normalize story {story.get('id')}: {e}")
+                record = None
+            if record is None:
+                skipped += 1
+            else:
+                records.append(record)
+        logger.info(f"Normalized {len(records)} stories, skipped {skipped}")
+        return records
+
+    @staticmethod
+    def _finish_cafe(record: Dict[str, Any], blok: Mapping[str, Any]):
+        title, name = record.get("title"), record.get("name")
+        record["title"] = title or name or ""
+        record["name"] = name or title or ""
+        record["summary"] = record.get("short_summary") or create_summary(record.get("description", ""))
+        if not record.get("location"):
+            location = f"{record.get('city', '')}, {record.get('address', '')}".strip()
+            record["location"] = location[1:].lstrip() if location.startswith(",") else location
+        coords = parse_geo_location(blok.get("geo_location"))
+        if coords is not None:
+            record["_geoloc"] = {"lat": coords[0], "lng": coords[1]}
+        else:
+            record.pop("geo_location", None)
+        for field in ("hero_image", "image"):
+            if record.get(field) is None:
+                record.pop(field, None)
+
+    @staticmethod
+    def _finish_event(record: Dict[str, Any]):
+        record["summary"] = create_summary(record.get("description", ""))
+        if record.get("image") is None:
+            record.pop("image", None)
+
+    def _add_metadata(self, record: Dict[str, Any], metadata: Any):
+        if not isinstance(metadata, list) or not metadata or not isinstance(metadata[0], dict):
+            record.setdefault("tags", [])
+            record.update(rating=None, ai_summary="", ai_tags=[], detected_language="en", open_now=False)
+            return
+
+        meta = metadata[0]
+        values = {field: convert(meta.get(field)) for field, convert in self.plan_for("metadata")}
+        # Component-level values win; metadata only fills the gaps
+        for field in ("tags", "opening_hours", "specialties"):
+            if not record.get(field):
+                record[field] = values.get(field) or ([] if field == "tags" else "")
+        record["metadata"] = record["tags"]
+        record["rating"] = values.get("rating")
+        record["ai_summary"] = values.get("ai_summary") or ""
+        record["ai_tags"] = values.get("ai_tags") or []
+        record["detected_language"] = values.get("detected_language") or "en"
+        record["open_now"] = values.get("open_now") is True
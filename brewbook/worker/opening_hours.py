@@ -0,0 +1,455 @@
+import os
+import re
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone, tzinfo
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from richtext import richtext_to_text
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+# Half-open [start, end) minute-of-week intervals, Monday 00:00 == 0
+Intervals = List[Tuple[int, int]]
+
+# IANA zone for cafés whose record has no (valid) timezone
+DEFAULT_TIMEZONE = os.getenv("CAFE_TIMEZONE", "UTC")
+
+_DAYS = {
+    "monday": 0, "mon": 0,
+    "tuesday": 1, "tue": 1, "tues": 1,
+    "wednesday": 2, "wed": 2,
+    "thursday": 3, "thu": 3, "thur": 3, "thurs": 3,
+    "friday": 4, "fri": 4,
+    "saturday": 5, "sat": 5,
+    "sunday": 6, "sun": 6,
+}
+_DAY_GROUPS = {
+    "daily": range(7), "everyday": range(7), "every day": range(7),
+    "weekdays": range(5), "weekends": (5, 6), "weekend": (5, 6),
+}
+
+_SEGMENT_SPLIT = re.compile(r"[,;\n]+")
+_DAY_RANGE = re.compile(r"^\s*([a-z ]+?)\s*(?:[-–]\s*([a-z]+))?\s*$")
+_TIME_RANGE = re.compile(
+    r"(\d{1,2})(?:[:.](\d{2}))?\s*(am|pm)?\s*[-–]\s*(\d{1,2})(?:[:.](\d{2}))?\s*(am|pm)?"
+)
+_STARTS_WITH_TIME = re.compile(r"^\s*\d")
+_CLOSED = re.compile(r"^\s*closed\s*$")
+_ALL_DAY = re.compile(r"^\s*(24\s*(h|hours|/7)|open 24 hours|all day)\s*$")
+
+
+def _to_minutes(hour: str, minute: Optional[str], meridiem: Optional[str]) -> int:
+    h = int(hour)
+    if meridiem == "pm" and h < 12:
+        h += 12
+    elif meridiem == "am" and h == 12:
+        h = 0
+    return h * 60 + int(minute or 0)
+
+
+def _parse_days(text: str) -> Optional[Iterable[int]]:
+    text = text.strip()
+    if text in _DAY_GROUPS:
+        return _DAY_GROUPS[text]
+    match = _DAY_RANGE.match(text)
+    if not match or match.group(1) not in _DAYS:
+        return None
+    first = _DAYS[match.group(1)]
+    if match.group(2) is None:
+        return (first,)
+    last = _DAYS.get(match.group(2))
+    if last is None:
+        return None
+    # Ranges such as "Friday-Monday" wrap around the week
+    return [(first + offset) % 7 for offset in range((last - first) % 7 + 1)]
+
+
+def parse_opening_hours(value: Any) -> Intervals:
+    """
+    Compile free-text opening hours into minute-of-week intervals.
+
+    Accepts plain strings or Storyblok richtext such as
+    "Monday-Friday: 7:00-19:00, Saturday: 8:00-16:00, Sunday: Closed".
+    Later segments override earlier ones for the same day, a segment that
+    starts with a time continues the previous segment's days (split shifts
+    such as "Monday-Friday: 7:00-12:00, 13:00-19:00"), times past midnight
+    spill into the next day, and unparseable segments are skipped.
+
+    Args:
+        value: Opening hours string or richtext document
+
+    Returns:
+        Intervals: Sorted, merged [start, end) minute-of-week intervals
+    """
+    text = richtext_to_text(value).lower()
+    per_day: Dict[int, List[Tuple[int, int]]] = {}
+    previous_days: Optional[Iterable[int]] = None
+    for segment in _SEGMENT_SPLIT.split(text):
+        continuation = bool(_STARTS_WITH_TIME.match(segment))
+        if continuation:
+            days, hours_text = previous_days, segment
+        elif ":" in segment:
+            day_text, hours_text = segment.split(":", 1)
+            days = _parse_days(day_text)
+        else:
+            continue
+        if days is None:
+            continue
+        previous_days = days
+        if _CLOSED.match(hours_text):
+            spans = []
+        elif _ALL_DAY.match(hours_text):
+            spans = [(0, MINUTES_PER_DAY)]
+        else:
+            spans = []
+            for match in _TIME_RANGE.finditer(hours_text):
+                start = _to_minutes(match.group(1), match.group(2), match.group(3))
+                end = _to_minutes(match.group(4), match.group(5), match.group(6))
+                if end <= start:
+                    end += MINUTES_PER_DAY
+                spans.append((start, end))
+            if not spans:
+                continue
+        for day in days:
+            per_day[day] = per_day.get(day, []) + spans if continuation else spans
+
+    intervals = []
+    for day, spans in per_day.items():
+        for start, end in spans:
+            start += day * MINUTES_PER_DAY
+            end += day * MINUTES_PER_DAY
+            if end > MINUTES_PER_WEEK:
+                intervals.append((0, end - MINUTES_PER_WEEK))
+                end = MINUTES_PER_WEEK
+            intervals.append((start, end))
+    return _merge(intervals)
+
+
+def _merge(intervals: Intervals) -> Intervals:
+    merged: Intervals = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def minute_of_week(moment: datetime) -> int:
+    """Convert a wall-clock datetime into minutes since Monday 00:00."""
+    return moment.weekday() * MINUTES_PER_DAY + moment.hour * 60 + moment.minute
+
+
+def is_open_at(intervals: Intervals, moment: datetime) -> bool:
+    """Check compiled intervals against a wall-clock datetime."""
+    minute = minute_of_week(moment)
+    position = bisect_right(intervals, (minute, MINUTES_PER_WEEK)) - 1
+    return position >= 0 and intervals[position][0] <= minute < intervals[position][1]
+
+
+@lru_cache(maxsize=256)
+def cafe_timezone(name: Optional[str]) -> tzinfo:
+    """Resolve a café's IANA timezone, falling back to CAFE_TIMEZONE and then UTC."""
+    for candidate in (name, DEFAULT_TIMEZONE):
+        if candidate:
+            try:
+                return ZoneInfo(candidate)
+            except (ZoneInfoNotFoundError, ValueError):
+                continue
+    return timezone.utc
+
+
+def next_boundary(intervals: Intervals, moment: datetime) -> Optional[datetime]:
+    """
+    Return the next opening or closing time after a wall-clock ``moment``.
+
+    Returns:
+        The boundary in the same wall clock as ``moment``, or None if the
+        café never opens
+    """
+    if not intervals:
+        return None
+    minute = minute_of_week(moment)
+    boundaries = sorted({edge for interval in intervals for edge in interval})
+    position = bisect_right(boundaries, minute)
+    if position < len(boundaries):
+        delta = boundaries[position] - minute
+    else:
+        delta = boundaries[0] + MINUTES_PER_WEEK - minute
+    return moment.replace(second=0, microsecond=0) + timedelta(minutes=delta)
+
+
+def open_now_state(hours: Any, timezone_name: Optional[str] = None,
+                   now: Optional[datetime] = None) -> Tuple[Optional[bool], Optional[datetime]]:
+    """
+    Evaluate a café's opening hours at café-local ``now``.
+
+    Args:
+        hours: Opening hours text, richtext or compiled intervals
+        timezone_name: The café's IANA timezone (see ``cafe_timezone``)
+        now: Aware moment to evaluate (default: current time)
+
+    Returns:
+        (open_now, next change as an aware UTC datetime); (None, None) if the
+        hours cannot be parsed
+    """
+    intervals = hours if isinstance(hours, list) else parse_opening_hours(hours)
+    if not intervals:
+        return None, None
+    local = (now or datetime.now(timezone.utc)).astimezone(cafe_timezone(timezone_name))
+    change = next_boundary(intervals, local)
+    return is_open_at(intervals, local), change.astimezone(timezone.utc) if change else None
+
+
+def refresh_open_now(records: Iterable[Mapping[str, Any]],
+                     now: Optional[datetime] = None) -> Tuple[List[Dict[str, Any]], Optional[datetime]]:
+    """
+    Recompute open_now for search records at ``now``.
+
+    Args:
+        records: Records with objectID, opening_hours, timezone and open_now
+        now: Aware moment to evaluate (default: current time)
+
+    Returns:
+        (partial updates {"objectID", "open_now"} for records whose value
+        flipped, earliest next change across all records in UTC or None)
+    """
+    now = now or datetime.now(timezone.utc)
+    updates: List[Dict[str, Any]] = []
+    earliest: Optional[datetime] = None
+    for record in records:
+        is_open, change = open_now_state(record.get("opening_hours"), record.get("timezone"), now)
+        if is_open is None:
+            continue
+        if is_open != record.get("open_now"):
+            updates.append({"objectID": record["objectID"], "open_now": is_open})
+        if change is not None and (earliest is None or change < earliest):
+            earliest = change
+    return updates, earliest
+
+
+def _popcount(bitmap: int) -> int:
+    return bin(bitmap).count("1")
+
+
+# Bit positions set in each byte value, for decoding bitmaps a byte at a time
+_BYTE_BITS = tuple(tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256))
+
+
+def bitmap_rows(bitmap: int, limit: Optional[int] = None) -> Iterator[int]:
+    """Yield the set bit positions of ``bitmap`` in ascending order, in time linear in its size."""
+    if limit is not None and limit <= 0:
+        return
+    count = 0
+    data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")
+    for offset, value in enumerate(data):
+        if value:
+            base = offset * 8
+            for bit in _BYTE_BITS[value]:
+                yield base + bit
+                count += 1
+                if count == limit:
+                    return
+
+
+class _ZoneTable:
+    """Week cuts and open-café bitmaps for the cafés of one timezone."""
+
+    __slots__ = ("boundaries", "states", "cafes")
+
+    def __init__(self):
+        self.boundaries: List[int] = [0]
+        self.states: List[int] = [0]
+        self.cafes = 0
+
+    def state_at(self, minute: int) -> int:
+        return self.states[bisect_right(self.boundaries, minute) - 1]
+
+    def toggle(self, bit: int, intervals: Intervals):
+        """Flip ``bit`` over ``intervals``, adding and dropping cuts as needed."""
+        boundaries, states = self.boundaries, self.states
+        for start, end in intervals:
+            first = self._cut(start)
+            last = self._cut(end) if end < MINUTES_PER_WEEK else len(boundaries)
+            for position in range(first, last):
+                states[position] ^= bit
+        # Cuts where nothing changes any more are dropped
+        for start, end in intervals:
+            for edge in (start, end):
+                position = bisect_left(boundaries, edge)
+                if 0 < position < len(boundaries) and boundaries[position] == edge \
+                        and states[position] == states[position - 1]:
+                    del boundaries[position]
+                    del states[position]
+
+    def _cut(self, minute: int) -> int:
+        position = bisect_left(self.boundaries, minute)
+        if position == len(self.boundaries) or self.boundaries[position] != minute:
+            self.boundaries.insert(position, minute)
+            self.states.insert(position, self.states[position - 1])
+        return position
+
+
+class OpeningHoursIndex:
+    """
+    Weekly interval index answering "which cafés are open at T".
+
+    Every café gets a bit position, and cafés are grouped by timezone. Each
+    zone's week is cut at every distinct opening/closing minute of its
+    cafés, and each cut stores an int bitmap of the cafés open until the next
+    cut, so a lookup is one bisect per zone plus one bitmap decode. Upserts
+    and removals flip the café's bit over its own intervals only, so writes
+    cost no more than the cuts they touch.
+
+    Aware moments are converted into each zone's wall clock; naive moments
+    are taken as café-local wall-clock times in every zone.
+    """
+
+    def __init__(self):
+        self._rows: Dict[Any, int] = {}
+        self._keys: List[Any] = []
+        self._intervals: List[Optional[Intervals]] = []
+        self._zones_of: List[Optional[tzinfo]] = []
+        self._slugs: List[Optional[str]] = []
+        self._free: List[int] = []
+        self._zones: Dict[tzinfo, _ZoneTable] = {}
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._rows
+
+    # ---------- Writes ----------
+    def upsert(self, key: Any, hours: Any, slug: Optional[str] = None, timezone_name: Optional[str] = None):
+        """
+        Index a café from opening hours text/richtext or precompiled intervals.
+
+        Args:
+            timezone_name: The café's IANA timezone (see ``cafe_timezone``)
+        """
+        intervals = hours if isinstance(hours, list) else parse_opening_hours(hours)
+        zone = cafe_timezone(timezone_name)
+        row = self._rows.get(key)
+        if row is None:
+            if self._free:
+                row = self._free.pop()
+            else:
+                row = len(self._keys)
+                self._keys.append(None)
+                self._intervals.append(None)
+                self._zones_of.append(None)
+                self._slugs.append(None)
+            self._rows[key] = row
+            self._keys[row] = key
+        else:
+            self._unlink(row)
+        self._intervals[row] = intervals
+        self._zones_of[row] = zone
+        self._slugs[row] = slug
+        table = self._zones.get(zone)
+        if table is None:
+            table = self._zones[zone] = _ZoneTable()
+        table.cafes += 1
+        table.toggle(1 << row, intervals)
+
+    def upsert_record(self, record: Dict[str, Any]) -> bool:
+        """
+        Index a normalized café record's opening_hours in its timezone.
+
+        Returns:
+            bool: True if the record was indexed, False if it was skipped
+        """
+        if record.get("type") != "cafe":
+            self.remove(record.get("storyId"))
+            return False
+        self.upsert(record["storyId"], record.get("opening_hours") or "", slug=record.get("slug"),
+                    timezone_name=record.get("timezone"))
+        return True
+
+    def remove(self, key: Any) -> bool:
+        """Drop a café from the index."""
+        row = self._rows.pop(key, None)
+        if row is None:
+            return False
+        self._unlink(row)
+        self._keys[row] = None
+        self._intervals[row] = None
+        self._zones_of[row] = None
+        self._slugs[row] = None
+        self._free.append(row)
+        return True
+
+    def _unlink(self, row: int):
+        zone = self._zones_of[row]
+        table = self._zones[zone]
+        table.toggle(1 << row, self._intervals[row])
+        table.cafes -= 1
+        if not table.cafes:
+            del self._zones[zone]
+
+    # ---------- Queries ----------
+    def _local_times(self, moment: datetime) -> Iterator[Tuple[_ZoneTable, datetime]]:
+        """Pair each zone's table with ``moment`` on that zone's wall clock."""
+        zones = self._zones.items() if self._zones else [(timezone.utc, _ZoneTable())]
+        for zone, table in zones:
+            yield table, moment.astimezone(zone) if moment.tzinfo else moment
+
+    def open_bitmap(self, moment: datetime) -> int:
+        """Return the bitmap of rows open at ``moment``."""
+        bitmap = 0
+        for table, local in self._local_times(moment):
+            bitmap |= table.state_at(minute_of_week(local))
+        return bitmap
+
+    def open_at(self, moment: datetime, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        List cafés open at ``moment``.
+
+        Args:
+            limit: Return at most this many
+
+        Returns:
+            List of {"id", "slug"} dicts
+        """
+        return [{"id": self._keys[row], "slug": self._slugs[row]}
+                for row in bitmap_rows(self.open_bitmap(moment), limit)]
+
+    def search(self, moment: datetime, limit: int = 100) -> Dict[str, Any]:
+        """
+        Count and list cafés open at ``moment``.
+
+        Returns:
+            Dict with "nbHits" and "hits" ({"id", "slug"} dicts, up to ``limit``)
+        """
+        bitmap = self.open_bitmap(moment)
+        hits = [{"id": self._keys[row], "slug": self._slugs[row]} for row in bitmap_rows(bitmap, limit)]
+        return {"nbHits": _popcount(bitmap), "hits": hits}
+
+    def is_open(self, key: Any, moment: datetime) -> bool:
+        """Check whether a single café is open at ``moment``."""
+        row = self._rows.get(key)
+        return row is not None and bool(self.open_bitmap(moment) >> row & 1)
+
+    def next_change(self, moment: datetime) -> datetime:
+        """
+        Return the next time any café opens or closes after ``moment``.
+
+        Schedulers use this to refresh open_now values exactly when they flip.
+        Aware moments get an aware UTC answer; naive ones a wall-clock time.
+        """
+        earliest: Optional[datetime] = None
+        for table, local in self._local_times(moment):
+            minute = minute_of_week(local)
+            position = bisect_right(table.boundaries, minute)
+            # Past the last cut the next one is always Monday 00:00
+            boundary = table.boundaries[position] if position < len(table.boundaries) else MINUTES_PER_WEEK
+            change = local.replace(second=0, microsecond=0) + timedelta(minutes=boundary - minute)
+            if moment.tzinfo:
+                change = change.astimezone(timezone.utc)
+            if earliest is None or change < earliest:
+                earliest = change
+        return earliest
@@ -0,0 +1,199 @@
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Histogram bucket upper bounds in milliseconds: 10us doubling up to ~42s
+BUCKET_BOUNDS_MS = tuple(0.01 * 2 ** i for i in range(23))
+
+
+class StageTimer:
+    """Collects (stage, milliseconds) pairs for a single request."""
+
+    __slots__ = ("stages",)
+
+    def __init__(self):
+        self.stages: List[Tuple[str, float]] = []
+
+    def add(self, name: str, duration_ms: float):
+        self.stages.append((name, duration_ms))
+
+    def server_timing(self) -> str:
+        """Format the stages as a Server-Timing header value."""
+        return ", ".join(f"{name};dur={duration:.3f}" for name, duration in self.stages)
+
+
+_current_timer: ContextVar[Optional[StageTimer]] = ContextVar("stage_timer", default=None)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    Time a block as a named stage of the current request.
+
+    A no-op (apart from two clock reads) outside requests handled by
+    StageTimingMiddleware.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer = _current_timer.get()
+        if timer is not None:
+            timer.add(name, (time.perf_counter() - started) * 1000.0)
+
+
+class StageHistograms:
+    """Fixed log-bucket latency histograms, one per stage name."""
+
+    def __init__(self, bounds_ms: Tuple[float, ...] = BUCKET_BOUNDS_MS):
+        self.bounds_ms = bounds_ms
+        self._counts: Dict[str, List[int]] = {}
+        self._sums: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, duration_ms: float):
+        bucket = bisect_left(self.bounds_ms, duration_ms)
+        with self._lock:
+            counts = self._counts.get(name)
+            if counts is None:
+                counts = self._counts[name] = [0] * (len(self.bounds_ms) + 1)
+                self._sums[name] = 0.0
+            counts[bucket] += 1
+            self._sums[name] += duration_ms
+
+    def observe_timer(self, timer: StageTimer):
+        for name, duration_ms in timer.stages:
+            self.observe(name, duration_ms)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Summarize every stage.
+
+        Percentiles are bucket upper bounds, so they over-estimate by at most 2x.
+        """
+        with self._lock:
+            counts = {name: list(values) for name, values in self._counts.items()}
+            sums = dict(self._sums)
+        result = {}
+        for name, buckets in counts.items():
+            total = sum(buckets)
+            result[name] = {
+                "count": total,
+                "mean_ms": round(sums[name] / total, 3) if total else 0.0,
+                "p50_ms": self._percentile(buckets, total, 0.50),
+                "p90_ms": self._percentile(buckets, total, 0.90),
+                "p99_ms": self._percentile(buckets, total, 0.99),
+                "buckets": {self._label(i): count for i, count in enumerate(buckets) if count},
+            }
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+            self._sums.clear()
+
+    def _percentile(self, buckets: List[int], total: int, fraction: float) -> Optional[float]:
+        if not total:
+            return None
+        threshold = fraction * total
+        running = 0
+        for index, count in enumerate(buckets):
+            running += count
+            if running >= threshold:
+                return round(self.bounds_ms[index], 3) if index < len(self.bounds_ms) else float("inf")
+        return float("inf")
+
+    def _label(self, index: int) -> str:
+        return f"le_{self.bounds_ms[index]:g}" if index < len(self.bounds_ms) else "inf"
+
+
+class StageTimingMiddleware:
+    """
+    ASGI middleware that times every HTTP request by stage.
+
+    Handlers mark stages with ``stage(name)``; the middleware adds a
+    ``total`` stage, attaches everything as a Server-Timing header and feeds
+    the stage histograms once the response has been sent.
+    """
+
+    def __init__(self, app, histograms: StageHistograms):
+        self.app = app
+        self.histograms = histograms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timer = StageTimer()
+        token = _current_timer.set(timer)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                timer.add("total", (time.perf_counter() - started) * 1000.0)
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timer.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_timer.reset(token)
+            self.histograms.observe_timer(timer)
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler for the running process.
+
+    A background thread snapshots every other thread's stack with
+    ``sys._current_frames()`` at a fixed interval and aggregates them into
+    collapsed-stack lines ("outer;inner;leaf count") that flamegraph.pl and
+    speedscope read directly. Only one capture runs at a time.
+    """
+
+    def __init__(self, max_depth: int = 128):
+        self.max_depth = max_depth
+        self._lock = threading.Lock()
+
+    @property
+    def busy(self) -> bool:
+        return self._lock.locked()
+
+    def capture(self, seconds: float, interval: float = 0.005) -> str:
+        """
+        Sample all threads for ``seconds`` and return collapsed stacks.
+
+        Raises:
+            RuntimeError: If another capture is already running
+        """
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("A profile capture is already running")
+        try:
+            stacks: Counter = Counter()
+            own_thread = threading.get_ident()
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id != own_thread:
+                        stacks[self._collapse(frame)] += 1
+                time.sleep(interval)
+            return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+        finally:
+            self._lock.release()
+
+    def _collapse(self, frame) -> str:
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        return ";".join(reversed(names))
@@ -0,0 +1,108 @@
+import hashlib
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional
+
+from normalizer import RecordNormalizer
+
+# Attribute that stores each record's content digest in the search index
+DIGEST_ATTRIBUTE = "digest"
+
+# Excluded from digests: the digest itself, and open_now, which changes with
+# the clock and is kept current by the open_now refresh rather than reconcile
+UNDIGESTED_ATTRIBUTES = frozenset({DIGEST_ATTRIBUTE, "open_now"})
+
+# Above this share of the index, orphans more likely mean the story listing was
+# cut short than that content was deleted, so deletes need explicit confirmation
+MAX_ORPHAN_FRACTION = 0.1
+
+
+def record_digest(record: Mapping[str, Any]) -> str:
+    """
+    Hash a search record's content independently of key order.
+
+    The digest attribute itself and the time-dependent open_now flag are
+    excluded so stored records hash the same as freshly normalized ones.
+    """
+    content = {key: value for key, value in record.items() if key not in UNDIGESTED_ATTRIBUTES}
+    canonical = json.dumps(content, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+
+class ReconcilePlan(NamedTuple):
+    """Fixes needed to bring the index in line with Storyblok."""
+    missing: List[Dict[str, Any]]
+    stale: List[Dict[str, Any]]
+    orphaned: List[str]
+    checked: int
+
+    @property
+    def drift(self) -> int:
+        return len(self.missing) + len(self.stale) + len(self.orphaned)
+
+    def batches(self, size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Yield Algolia batch operations for the drift only.
+
+        Upserts carry the record (with its digest attribute); orphans are deleted.
+        """
+        if size <= 0:
+            raise ValueError("Batch size must be positive")
+        operations = [{"action": "updateObject", "body": record} for record in self.missing + self.stale]
+        operations += [{"action": "deleteObject", "body": {"objectID": object_id}} for object_id in self.orphaned]
+        for start in range(0, len(operations), size):
+            yield operations[start:start + size]
+
+    def orphans_implausible(self, max_fraction: float = MAX_ORPHAN_FRACTION) -> bool:
+        """Whether the orphans are too many, relative to the index, to delete unconfirmed."""
+        indexed = self.checked - len(self.missing) + len(self.orphaned)
+        return bool(self.orphaned) and len(self.orphaned) > max_fraction * max(indexed, 1)
+
+    def without_orphans(self) -> "ReconcilePlan":
+        """The same plan with deletions dropped."""
+        return self._replace(orphaned=[])
+
+    def summary(self) -> Dict[str, int]:
+        return {"checked": self.checked, "missing": len(self.missing),
+                "stale": len(self.stale), "orphaned": len(self.orphaned)}
+
+
+def plan_reconcile(stories: Iterable[Mapping[str, Any]], index_digests: Mapping[str, Optional[str]],
+                   normalizer: Optional[RecordNormalizer] = None) -> ReconcilePlan:
+    """
+    Compare streamed stories against the index's stored digests.
+
+    Stories are consumed one at a time and normalized with the shared
+    normalizer; each record's digest is looked up in ``index_digests``
+    (objectID -> digest, None when the record has no stored digest). Only
+    records that are missing or whose digest differs are retained, so memory
+    and the resulting writes scale with the drift rather than the space.
+
+    Args:
+        stories: Iterable of Storyblok stories with content
+        index_digests: objectID -> stored digest for every record in the index
+        normalizer: Record normalizer (a default one is created if omitted)
+
+    Returns:
+        ReconcilePlan: Missing, stale and orphaned records
+    """
+    normalizer = normalizer or RecordNormalizer()
+    missing: List[Dict[str, Any]] = []
+    stale: List[Dict[str, Any]] = []
+    seen = set()
+    checked = 0
+    for story in stories:
+        record = normalizer.normalize_story(story)
+        if record is None:
+            continue
+        checked += 1
+        object_id = record["objectID"]
+        seen.add(object_id)
+        digest = record_digest(record)
+        if object_id not in index_digests:
+            record[DIGEST_ATTRIBUTE] = digest
+            missing.append(record)
+        elif index_digests[object_id] != digest:
+            record[DIGEST_ATTRIBUTE] = digest
+            stale.append(record)
+    orphaned = sorted(object_id for object_id in index_digests if object_id not in seen)
+    return ReconcilePlan(missing, stale, orphaned, checked)
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Replay captured Storyblok webhook traffic against the worker's ASGI app.
+
+Usage:
+    python3 replay.py capture.wcap [--speed 1|N|max] [--concurrency 64] [--resign]
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import httpx
+
+from traffic_capture import CapturedRequest, read_capture
+
+# Settings cleared before the app is imported by the CLI
+REPLAY_DISABLED_SETTINGS = ("WEBHOOK_CAPTURE_FILE", "STORY_CACHE_DB", "STORYBLOK_TOKEN",
+                            "SEARCH_REINDEX_URL", "NEXT_REVALIDATE_URL", "CDN_PURGE_URL")
+
+
+def _percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def build_report(latencies_ms: List[float], statuses: Counter, lags_ms: List[float],
+                 elapsed: float, captured_span: float) -> Dict[str, Any]:
+    """Summarize a replay run."""
+    ordered = sorted(latencies_ms)
+    count = len(ordered)
+    return {
+        "requests": count,
+        "elapsed_s": round(elapsed, 3),
+        "captured_span_s": round(captured_span, 3),
+        "throughput_rps": round(count / elapsed, 1) if elapsed > 0 else float("inf"),
+        "latency_ms": {
+            "p50": round(_percentile(ordered, 0.50), 3),
+            "p90": round(_percentile(ordered, 0.90), 3),
+            "p99": round(_percentile(ordered, 0.99), 3),
+            "max": round(ordered[-1], 3) if ordered else 0.0,
+        },
+        "max_schedule_lag_ms": round(max(lags_ms), 3) if lags_ms else 0.0,
+        "statuses": {str(status): n for status, n in sorted(statuses.items())},
+    }
+
+
+async def replay(app, requests: Iterable[CapturedRequest], speed: float = 1.0,
+                 path: str = "/webhooks/storyblok", concurrency: int = 64,
+                 resign_secret: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Re-drive captured requests through an ASGI app in-process.
+
+    Requests are pulled from ``requests`` one at a time as they come due, and
+    at most ``concurrency`` are in flight, so memory stays flat however large
+    the capture is (pass ``read_capture(path)`` directly).
+
+    Args:
+        app: ASGI application (e.g. ``main.app``)
+        requests: Captured requests in arrival order
+        speed: Time scale; 1 keeps the original gaps, N is N times faster,
+            0 (or less) fires as fast as ``concurrency`` allows
+        path: Endpoint the requests are sent to
+        concurrency: Maximum requests in flight
+        resign_secret: Re-sign bodies with this secret (for captures taken
+            with a different production secret)
+
+    Returns:
+        Dict with throughput, latency percentiles, schedule lag and status counts
+    """
+    slots = asyncio.Semaphore(concurrency)
+    in_flight = set()
+    errors: List[BaseException] = []
+    latencies_ms: List[float] = []
+    lags_ms: List[float] = []
+    statuses: Counter = Counter()
+    first_arrival = last_arrival = None
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://replay") as client:
+        started = time.perf_counter()
+
+        async def send(captured: CapturedRequest, headers: Dict[str, str]):
+            try:
+                sent = time.perf_counter()
+                response = await client.post(path, content=captured.body, headers=headers)
+                latencies_ms.append((time.perf_counter() - sent) * 1000.0)
+                statuses[response.status_code] += 1
+            finally:
+                slots.release()
+
+        def finished(task: asyncio.Task):
+            in_flight.discard(task)
+            if not task.cancelled() and task.exception():
+                errors.append(task.exception())
+
+        for captured in requests:
+            if first_arrival is None:
+                first_arrival = captured.arrival
+            last_arrival = captured.arrival
+            if speed > 0:
+                due = (captured.arrival - first_arrival) / speed
+                delay = due - (time.perf_counter() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            await slots.acquire()
+            if speed > 0:
+                lags_ms.append(max(0.0, (time.perf_counter() - started - due) * 1000.0))
+            headers = dict(captured.headers)
+            if resign_secret:
+                headers["webhook-signature"] = hmac.new(
+                    resign_secret.encode("utf-8"), captured.body, hashlib.sha256
+                ).hexdigest()
+            task = asyncio.create_task(send(captured, headers))
+            in_flight.add(task)
+            task.add_done_callback(finished)
+
+        await asyncio.gather(*in_flight, return_exceptions=True)
+        elapsed = time.perf_counter() - started
+        if errors:
+            raise errors[0]
+
+    if first_arrival is None:
+        return build_report([], Counter(), [], 0.0, 0.0)
+    return build_report(latencies_ms, statuses, lags_ms, elapsed, last_arrival - first_arrival)
+
+
+def parse_speed(value: str) -> float:
+    """Parse --speed: 'max' or a positive multiplier such as 1, 10 or 0.5."""
+    if value.lower() in ("max", "0"):
+        return 0.0
+    speed = float(value.rstrip("xX"))
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("speed must be positive or 'max'")
+    return speed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay captured webhook traffic against the worker app.")
+    parser.add_argument("capture", help="Capture file written with WEBHOOK_CAPTURE_FILE")
+    parser.add_argument("--speed", type=parse_speed, default=1.0, help="1 (original timing), N (N times faster) or max")
+    parser.add_argument("--concurrency", type=int, default=64, help="Maximum requests in flight")
+    parser.add_argument("--path", default="/webhooks/storyblok", help="Endpoint to replay against")
+    parser.add_argument("--resign", action="store_true",
+                        help="Re-sign bodies with the local STORYBLOK_WEBHOOK_SECRET")
+    args = parser.parse_args()
+
+    # Replay must not record itself, touch the on-disk story cache or notify
+    # real downstream targets. Empty values win over .env (load_dotenv does not
+    # override variables that are already set).
+    for name in REPLAY_DISABLED_SETTINGS:
+        os.environ[name] = ""
+
+    # Imported late so the app picks up .env before it reads its configuration
+    import main as worker
+
+    report = asyncio.run(replay(
+        worker.app,
+        read_capture(args.capture),
+        speed=args.speed,
+        path=args.path,
+        concurrency=args.concurrency,
+        resign_secret=worker.STORYBLOK_WEBHOOK_SECRET if args.resign else None,
+    ))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
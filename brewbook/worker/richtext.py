@@ -0,0 +1,26 @@
+from typing import Any
+
+
+def _inline_text(node: Any) -> str:
+    if not isinstance(node, dict):
+        return ""
+    if node.get("type") == "text":
+        return node.get("text", "")
+    return "".join(_inline_text(child) for child in node.get("content") or ())
+
+
+def richtext_to_text(node: Any) -> str:
+    """
+    Flatten a Storyblok richtext document to plain text.
+
+    Top-level blocks (paragraphs) are separated by newlines; plain strings
+    are returned unchanged so legacy text values keep working. Must stay in
+    step with ``extractRichtextContent`` in ``lib/services/RecordNormalizer.js``
+    so both normalizers write identical record text.
+    """
+    if isinstance(node, str):
+        return node.strip()
+    if not isinstance(node, dict):
+        return ""
+    blocks = (node.get("content") or ()) if node.get("type") == "doc" else (node,)
+    return "\n".join(text for text in map(_inline_text, blocks) if text).strip()
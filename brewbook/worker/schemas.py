@@ -0,0 +1,76 @@
+"""Storyblok component schemas shared by the seeder and the webhook worker."""
+
+METADATA_SCHEMA = {
+    "tags": {"type": "text", "display_name": "Tags (comma-separated)"},
+    "opening_hours": {"type": "richtext", "display_name": "Opening Hours (structured)"},
+    "rating": {"type": "number"},
+    "specialties": {"type": "text", "display_name": "Coffee specialties"},
+    "ai_summary": {"type": "text", "display_name": "AI Generated Summary"},
+    "ai_tags": {"type": "text", "display_name": "AI Generated Tags"},
+    "detected_language": {"type": "text", "display_name": "Detected Language"},
+    "open_now": {"type": "boolean", "display_name": "Currently Open"}
+}
+
+CAFE_SCHEMA = {
+    # Basic Info
+    "title": {"type": "text", "display_name": "Café Title"},
+    "description": {"type": "richtext", "display_name": "Long Description"},
+    "short_summary": {"type": "text", "display_name": "Short Summary (1-2 sentences)"},
+
+    # Location & Hours
+    "address": {"type": "text", "display_name": "Street Address"},
+    "city": {"type": "text", "display_name": "City"},
+    "geo_location": {"type": "text", "display_name": "Latitude,Longitude"},
+    "opening_hours": {"type": "richtext", "display_name": "Opening Hours (structured)"},
+    "timezone": {"type": "text", "display_name": "Timezone (IANA, e.g. Europe/Berlin)"},
+
+    # Amenities & Features
+    "wifi": {"type": "boolean", "display_name": "WiFi Available"},
+    "power_outlets": {"type": "boolean", "display_name": "Power Outlets Available"},
+    "noise_level": {"type": "option", "display_name": "Noise Level", "options": [
+        {"name": "Quiet", "value": "quiet"},
+        {"name": "Moderate", "value": "moderate"},
+        {"name": "Loud", "value": "loud"}
+    ]},
+    "seating_capacity": {"type": "option", "display_name": "Seating Capacity", "options": [
+        {"name": "Small (1-20)", "value": "small"},
+        {"name": "Medium (21-50)", "value": "medium"},
+        {"name": "Large (50+)", "value": "large"}
+    ]},
+    "outdoor_seating": {"type": "boolean", "display_name": "Outdoor Seating"},
+    "pet_friendly": {"type": "boolean", "display_name": "Pet Friendly"},
+
+    # Media
+    "hero_image": {"type": "asset", "display_name": "Hero Image"},
+    "gallery": {"type": "asset", "display_name": "Gallery Images", "multiple": True},
+
+    # Tags & Categories
+    "tags": {"type": "text", "display_name": "Tags (comma-separated)"},
+    "price_range": {"type": "option", "display_name": "Price Range", "options": [
+        {"name": "$", "value": "budget"},
+        {"name": "$$", "value": "moderate"},
+        {"name": "$$$", "value": "expensive"}
+    ]},
+    "specialties": {"type": "text", "display_name": "Coffee Specialties"},
+
+    # Legacy fields for compatibility
+    "name": {"type": "text", "display_name": "Legacy Name Field"},
+    "image": {"type": "asset", "display_name": "Legacy Image Field"},
+    "location": {"type": "text", "display_name": "Legacy Location Field"},
+    "metadata": {"type": "bloks", "restrict_components": True, "component_whitelist": ["metadata"]}
+}
+
+EVENT_SCHEMA = {
+    "title": {"type": "text"},
+    "description": {"type": "richtext"},
+    "date": {"type": "datetime"},
+    "image": {"type": "asset"},
+    "location": {"type": "text"},
+    "metadata": {"type": "bloks", "restrict_components": True, "component_whitelist": ["metadata"]}
+}
+
+COMPONENT_SCHEMAS = {
+    "metadata": METADATA_SCHEMA,
+    "cafe": CAFE_SCHEMA,
+    "event": EVENT_SCHEMA,
+}
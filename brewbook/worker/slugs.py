@@ -0,0 +1,94 @@
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+# Characters that NFKD does not decompose into an ASCII base letter.
+# Built once at import time so every slugify() call is a single translate().
+_TRANSLITERATION = str.maketrans({
+    "&": " and ",
+    "@": " at ",
+    "+": " plus ",
+    "ß": "ss",
+    "ẞ": "SS",
+    "æ": "ae",
+    "Æ": "AE",
+    "œ": "oe",
+    "Œ": "OE",
+    "ø": "o",
+    "Ø": "O",
+    "đ": "d",
+    "Đ": "D",
+    "ð": "d",
+    "Ð": "D",
+    "þ": "th",
+    "Þ": "TH",
+    "ł": "l",
+    "Ł": "L",
+    "ı": "i",
+    "’": "",
+    "'": "",
+})
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+@lru_cache(maxsize=4096)
+def slugify(text: str) -> str:
+    """
+    Convert a display name into a URL-safe ASCII slug.
+
+    Args:
+        text: Any Unicode string, e.g. "Café Aroma Artisan"
+
+    Returns:
+        str: Lowercase slug such as "cafe-aroma-artisan" (may be empty)
+    """
+    folded = unicodedata.normalize("NFKD", text.translate(_TRANSLITERATION))
+    ascii_text = folded.encode("ascii", "ignore").decode("ascii").lower()
+    return _NON_ALNUM.sub("-", ascii_text).strip("-")
+
+
+def find_collisions(names: Iterable[str]) -> Dict[str, List[str]]:
+    """
+    Group names that slugify to the same value.
+
+    Returns:
+        Dict mapping each colliding slug to the names that produce it
+    """
+    groups: Dict[str, List[str]] = {}
+    for name in names:
+        groups.setdefault(slugify(name), []).append(name)
+    return {slug: group for slug, group in groups.items() if len(group) > 1}
+
+
+def unique_slugs(names: Iterable[str], taken: Optional[Iterable[str]] = None) -> List[str]:
+    """
+    Slugify a batch of names, resolving collisions in a single pass.
+
+    The first occurrence keeps the plain slug; later ones get the lowest
+    free numeric suffix ("-2", "-3", ...). Slugs in ``taken`` are treated
+    as already in use so the result never clashes with them either.
+
+    Args:
+        names: Display names in input order
+        taken: Slugs that are reserved elsewhere (e.g. existing stories)
+
+    Returns:
+        List[str]: One unique slug per name, in input order
+    """
+    used = set(taken or ())
+    next_suffix: Dict[str, int] = {}
+    result = []
+    for name in names:
+        base = slugify(name) or "untitled"
+        slug = base
+        if slug in used:
+            suffix = next_suffix.get(base, 2)
+            while f"{base}-{suffix}" in used:
+                suffix += 1
+            next_suffix[base] = suffix + 1
+            slug = f"{base}-{suffix}"
+        used.add(slug)
+        result.append(slug)
+    return result
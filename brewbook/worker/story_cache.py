@@ -0,0 +1,299 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, NamedTuple, Optional, Union
+
+import httpx
+
+StoryKey = Union[int, str]
+
+
+class CacheEntry(NamedTuple):
+    """Serialized story ready to be served as-is."""
+    story_id: int
+    slug: Optional[str]
+    etag: str
+    body: bytes
+
+
+def make_entry(story: Dict[str, Any]) -> CacheEntry:
+    """
+    Serialize a story once, in the CDN API's {"story": ...} shape, with its ETag.
+
+    Raises:
+        ValueError: If the story has no integer id
+    """
+    if not isinstance(story.get("id"), int):
+        raise ValueError("Story has no integer id")
+    body = json.dumps({"story": story}, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+    return CacheEntry(story["id"], story.get("full_slug") or story.get("slug"), etag, body)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Evaluate an If-None-Match header against an ETag (weak comparison)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class StoryCache:
+    """
+    Story content cache keyed by story id and slug.
+
+    The memory tier is an LRU bounded by entry count and total body bytes.
+    When ``db_path`` is set, entries are also written through to a SQLite
+    tier (itself bounded by ``max_disk_entries``) that survives restarts and
+    refills the memory tier on a miss. Keys that Storyblok does not have are
+    remembered for ``negative_ttl`` seconds so repeated requests for them do
+    not each reach the API; publishing or invalidating the key forgets them.
+    """
+
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 32 * 1024 * 1024,
+                 db_path: Optional[str] = None, max_disk_entries: int = 100_000,
+                 negative_ttl: float = 30.0):
+        if max_entries <= 0 or max_bytes <= 0:
+            raise ValueError("Cache bounds must be positive")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_disk_entries = max_disk_entries
+        self._entries: "OrderedDict[int, CacheEntry]" = OrderedDict()
+        self._slugs: Dict[str, int] = {}
+        self._bytes = 0
+        self.negative_ttl = negative_ttl
+        self._missing: "OrderedDict[StoryKey, float]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._db: Optional[sqlite3.Connection] = None
+        self._disk_entries = 0
+        if db_path:
+            self._db = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS stories ("
+                "id INTEGER PRIMARY KEY, slug TEXT UNIQUE, etag TEXT NOT NULL, body BLOB NOT NULL, "
+                "stored_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS stories_stored_at ON stories (stored_at)")
+            # Counted once; put/invalidate/trim keep it current from row counts
+            (self._disk_entries,) = self._db.execute("SELECT COUNT(*) FROM stories").fetchone()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def get(self, key: StoryKey) -> Optional[CacheEntry]:
+        """Look up a story by numeric id or slug."""
+        story_id = key if isinstance(key, int) else self._slugs.get(key)
+        entry = self._entries.get(story_id) if story_id is not None else None
+        if entry is None:
+            entry = self._load(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._remember(entry)
+        else:
+            self._entries.move_to_end(story_id)
+        self.hits += 1
+        return entry
+
+    def put(self, story: Dict[str, Any]) -> CacheEntry:
+        """Cache a story (replacing any previous version) and return its entry."""
+        entry = make_entry(story)
+        self._forget(entry.story_id)
+        self._remember(entry)
+        self._missing.pop(entry.story_id, None)
+        self._missing.pop(entry.slug, None)
+        if self._db is not None:
+            replaced = self._db.execute("DELETE FROM stories WHERE id = ? OR slug = ?", (entry.story_id, entry.slug))
+            self._db.execute(
+                "INSERT INTO stories (id, slug, etag, body, stored_at) VALUES (?, ?, ?, ?, ?)",
+                (entry.story_id, entry.slug, entry.etag, entry.body, time.time()),
+            )
+            self._disk_entries += 1 - replaced.rowcount
+            self._trim_disk()
+        return entry
+
+    def put_missing(self, key: StoryKey):
+        """Remember that Storyblok has no story for ``key`` (for ``negative_ttl`` seconds)."""
+        if self.negative_ttl <= 0:
+            return
+        self._missing.pop(key, None)
+        self._missing[key] = time.monotonic() + self.negative_ttl
+        while len(self._missing) > self.max_entries:
+            self._missing.popitem(last=False)
+
+    def is_missing(self, key: StoryKey) -> bool:
+        """Whether ``key`` was recently found not to exist."""
+        expires = self._missing.get(key)
+        if expires is None:
+            return False
+        if expires <= time.monotonic():
+            del self._missing[key]
+            return False
+        return True
+
+    def invalidate(self, story_id: Optional[int] = None, slug: Optional[str] = None) -> bool:
+        """
+        Drop a story from every tier by id and/or slug.
+
+        Returns:
+            bool: True if anything was removed from memory
+        """
+        removed = False
+        if slug is not None and slug in self._slugs:
+            removed = self._forget(self._slugs[slug]) or removed
+        if story_id is not None:
+            removed = self._forget(story_id) or removed
+        self._missing.pop(story_id, None)
+        self._missing.pop(slug, None)
+        if self._db is not None:
+            deleted = self._db.execute("DELETE FROM stories WHERE id = ? OR slug = ?", (story_id, slug))
+            self._disk_entries -= deleted.rowcount
+        return removed
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _remember(self, entry: CacheEntry):
+        self._entries[entry.story_id] = entry
+        if entry.slug:
+            self._slugs[entry.slug] = entry.story_id
+        self._bytes += len(entry.body)
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, evicted = self._entries.popitem(last=False)
+            self._drop_slug(evicted)
+            self._bytes -= len(evicted.body)
+
+    def _forget(self, story_id: int) -> bool:
+        entry = self._entries.pop(story_id, None)
+        if entry is None:
+            return False
+        self._drop_slug(entry)
+        self._bytes -= len(entry.body)
+        return True
+
+    def _drop_slug(self, entry: CacheEntry):
+        if entry.slug and self._slugs.get(entry.slug) == entry.story_id:
+            del self._slugs[entry.slug]
+
+    def _load(self, key: StoryKey) -> Optional[CacheEntry]:
+        if self._db is None:
+            return None
+        column = "id" if isinstance(key, int) else "slug"
+        row = self._db.execute(f"SELECT id, slug, etag, body FROM stories WHERE {column} = ?", (key,)).fetchone()
+        return CacheEntry(row[0], row[1], row[2], bytes(row[3])) if row else None
+
+    def _trim_disk(self):
+        if self._disk_entries > self.max_disk_entries:
+            trimmed = self._db.execute(
+                "DELETE FROM stories WHERE id IN (SELECT id FROM stories ORDER BY stored_at LIMIT ?)",
+                (self._disk_entries - self.max_disk_entries,),
+            )
+            self._disk_entries -= trimmed.rowcount
+
+
+class StoryFetcher:
+    """
+    Fetches published stories from the Storyblok Content Delivery API.
+
+    Concurrent fetches of the same key share one request. Requests carry the
+    cache version (``cv``) last set by ``bump_cache_version``, so a refetch
+    after a publish is not answered from a stale CDN cache; Storyblok
+    redirects an unknown ``cv`` to its current one, which is followed.
+    """
+
+    def __init__(self, token: str, base_url: str = "https://api.storyblok.com/v2/cdn", timeout: float = 10.0,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        if not token:
+            raise ValueError("Storyblok token cannot be empty")
+        self.token = token
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.transport = transport
+        self.cache_version = int(time.time())
+        self._client: Optional[httpx.AsyncClient] = None
+        self._in_flight: Dict[StoryKey, "asyncio.Task[Optional[Dict[str, Any]]]"] = {}
+
+    def bump_cache_version(self):
+        """Make the next fetches bypass CDN caches (call when content was published)."""
+        self.cache_version = max(self.cache_version + 1, int(time.time()))
+
+    async def fetch(self, key: StoryKey) -> Optional[Dict[str, Any]]:
+        """
+        Fetch one published story by id or full slug.
+
+        Returns:
+            The story dict, or None if Storyblok does not have it
+        """
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(key))
+            self._in_flight[key] = task
+
+            def finished(done: asyncio.Task):
+                if self._in_flight.get(key) is done:
+                    del self._in_flight[key]
+
+            task.add_done_callback(finished)
+        # Shielded so one caller going away does not cancel the others' fetch
+        return await asyncio.shield(task)
+
+    async def iter_stories(self, per_page: int = 100) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream every published story with content, one page at a time.
+
+        Paging stops at the first short or empty page rather than trusting
+        the Total header.
+        """
+        page = 1
+        while True:
+            response = await self._http().get(
+                f"{self.base_url}/stories",
+                params={"token": self.token, "version": "published", "per_page": per_page,
+                        "page": page, "cv": self.cache_version},
+            )
+            response.raise_for_status()
+            stories = response.json().get("stories") or []
+            for story in stories:
+                yield story
+            if len(stories) < per_page:
+                return
+            page += 1
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout, follow_redirects=True,
+                                             transport=self.transport)
+        return self._client
+
+    async def _fetch(self, key: StoryKey) -> Optional[Dict[str, Any]]:
+        response = await self._http().get(
+            f"{self.base_url}/stories/{key}",
+            params={"token": self.token, "version": "published", "cv": self.cache_version},
+        )
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json().get("story")
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
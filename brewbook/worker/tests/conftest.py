@@ -0,0 +1,50 @@
+import hashlib
+import hmac
+import json
+import os
+
+# main reads its configuration at import time, so set it before any test module imports it
+os.environ["STORYBLOK_WEBHOOK_SECRET"] = "test_secret_123"
+os.environ["ENABLE_STAGE_TIMING"] = "true"
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from facets import FacetIndex
+from geo_index import GeoIndex
+from opening_hours import OpeningHoursIndex
+from story_cache import StoryCache
+
+WEBHOOK_SECRET = b"test_secret_123"
+
+
+def sign(body: bytes) -> str:
+    """Sign a webhook body with the test secret."""
+    return hmac.new(WEBHOOK_SECRET, body, hashlib.sha256).hexdigest()
+
+
+@pytest.fixture
+def worker_state(monkeypatch):
+    """Give the test empty café indexes, story cache and webhook history in ``main``."""
+    monkeypatch.setattr(main, "geo_index", GeoIndex())
+    monkeypatch.setattr(main, "hours_index", OpeningHoursIndex())
+    monkeypatch.setattr(main, "facet_index", FacetIndex())
+    monkeypatch.setattr(main, "story_cache", StoryCache())
+    monkeypatch.setattr(main, "story_event_counts", {})
+    return main
+
+
+@pytest.fixture
+def client(worker_state):
+    """Test client for the worker app, backed by fresh module state."""
+    return TestClient(main.app)
+
+
+@pytest.fixture
+def post_webhook(client):
+    """Post a payload to the webhook endpoint with a valid signature."""
+    def post(payload):
+        body = json.dumps(payload).encode()
+        return client.post("/webhooks/storyblok", content=body, headers={"webhook-signature": sign(body)})
+    return post
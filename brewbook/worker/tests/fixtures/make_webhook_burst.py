@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Generate tests/fixtures/webhook_burst.wcap, a synthetic webhook burst.
+
+The payloads have the shape Storyblok actually sends (action, text, space_id,
+story_id, full_slug; no story content), signed with the test secret, and the
+arrival times mimic a bulk publish: tight runs of requests separated by short
+pauses. Output is deterministic for a given seed.
+
+Usage (from worker/):
+    python3 tests/fixtures/make_webhook_burst.py [--count 200] [--seed 35]
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+from traffic_capture import CaptureWriter  # noqa: E402
+
+TEST_SECRET = b"test_secret_123"
+SPACE_ID = 286000
+FIRST_STORY_ID = 20000
+CAFES = 60
+START = 1760000000.0
+
+# Share of each action in a bulk editing session
+ACTIONS = (("published", 0.7), ("unpublished", 0.15), ("deleted", 0.05), ("moved", 0.1))
+
+
+def payload(action: str, story_id: int) -> bytes:
+    slug = f"cafes/burst-cafe-{story_id}"
+    return json.dumps({
+        "text": f"The user Burst Editor (editor@example.com) {action} the Story Burst Café {story_id} ({slug})",
+        "action": action,
+        "space_id": SPACE_ID,
+        "story_id": story_id,
+        "full_slug": slug,
+    }).encode("utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=35)
+    parser.add_argument("--out", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "webhook_burst.wcap"))
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    actions = [action for action, _ in ACTIONS]
+    weights = [weight for _, weight in ACTIONS]
+    if os.path.exists(args.out):
+        os.remove(args.out)
+    writer = CaptureWriter(args.out)
+    arrival = START
+    for i in range(args.count):
+        # A pause every 20 requests, otherwise requests arrive back to back
+        arrival += rng.uniform(0.05, 0.15) if i % 20 == 0 else rng.uniform(0.0005, 0.004)
+        body = payload(rng.choices(actions, weights)[0], FIRST_STORY_ID + i % CAFES)
+        writer.record(arrival, {
+            "content-type": "application/json",
+            "user-agent": "Storyblok-Webhook",
+            "webhook-signature": hmac.new(TEST_SECRET, body, hashlib.sha256).hexdigest(),
+        }, body)
+    writer.close()
+    print(f"Wrote {writer.count} requests to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from dispatcher import (CdnPurgeTarget, DispatchTarget, FanoutDispatcher, OutboundRequest,
+                        RevalidateTarget, _TargetRunner, story_paths)
+
+
+class StubServer:
+    """Local HTTP server that records requests and answers with scripted statuses."""
+
+    def __init__(self, statuses=(200,), delay=0.0):
+        self.statuses = list(statuses)
+        self.delay = delay
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("content-length", 0)))
+                stub.requests.append((time.monotonic(), json.loads(body or b"null")))
+                time.sleep(stub.delay)
+                status = stub.statuses.pop(0) if len(stub.statuses) > 1 else stub.statuses[0]
+                self.send_response(status)
+                self.send_header("content-length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/hook"
+        threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class EchoTarget(DispatchTarget):
+    """Posts the raw event to a stub server."""
+
+    def __init__(self, name, url, **kwargs):
+        super().__init__(name, backoff_base=0.01, **kwargs)
+        self.url = url
+
+    def build_requests(self, event):
+        return [OutboundRequest("POST", self.url, json=event)]
+
+
+@pytest.fixture
+def servers():
+    created = []
+
+    def make(**kwargs):
+        server = StubServer(**kwargs)
+        created.append(server)
+        return server
+
+    yield make
+    for server in created:
+        server.close()
+
+
+class TestFanoutDispatcher:
+    """Test fan-out isolation, retries and dead-lettering against stub servers."""
+
+    def test_slow_target_does_not_stall_others(self, servers, tmp_path):
+        """Test that a fast target finishes while a slow one is still working."""
+        slow, fast = servers(delay=0.25), servers()
+
+        async def scenario():
+            dispatcher = FanoutDispatcher([EchoTarget("slow", slow.url, concurrency=1),
+                                           EchoTarget("fast", fast.url, concurrency=4)],
+                                          dead_letter_dir=str(tmp_path))
+            await dispatcher.start()
+            for story_id in range(4):
+                assert dispatcher.dispatch({"action": "published", "story_id": story_id}) == 2
+            # dispatch only enqueues: nothing is delivered until the loop runs
+            assert dispatcher.stats()["slow"]["delivered"] == dispatcher.stats()["fast"]["delivered"] == 0
+            while dispatcher.stats()["fast"]["delivered"] < 4:
+                await asyncio.sleep(0.01)
+            slow_when_fast_done = dispatcher.stats()["slow"]["delivered"]
+            await dispatcher.drain()
+            stats = dispatcher.stats()
+            await dispatcher.stop()
+            return slow_when_fast_done, stats
+
+        slow_when_fast_done, stats = asyncio.run(scenario())
+        assert slow_when_fast_done < 4
+        assert stats["slow"]["delivered"] == stats["fast"]["delivered"] == 4
+        assert len(slow.requests) == 4 and len(fast.requests) == 4
+
+    def test_retries_then_delivers(self, servers, tmp_path):
+        """Test that retryable failures are retried with backoff until they succeed."""
+        flaky = servers(statuses=(503, 502, 200))
+
+        async def scenario():
+            dispatcher = FanoutDispatcher([EchoTarget("flaky", flaky.url, max_attempts=5)],
+                                          dead_letter_dir=str(tmp_path))
+            await dispatcher.start()
+            dispatcher.dispatch({"action": "published", "story_id": 1})
+            await dispatcher.drain()
+            stats = dispatcher.stats()
+            await dispatcher.stop()
+            return stats
+
+        assert asyncio.run(scenario())["flaky"] == {"queued": 0, "delivered": 1, "dead_lettered": 0}
+        assert len(flaky.requests) == 3
+
+    def test_exhausted_and_non_retryable_go_to_dead_letter(self, servers, tmp_path):
+        """Test that failed deliveries are written to the target's dead-letter file."""
+        down, rejecting = servers(statuses=(500,)), servers(statuses=(403,))
+
+        async def scenario():
+            dispatcher = FanoutDispatcher([EchoTarget("down", down.url, max_attempts=3),
+                                           EchoTarget("rejecting", rejecting.url, max_attempts=3)],
+                                          dead_letter_dir=str(tmp_path))
+            await dispatcher.start()
+            dispatcher.dispatch({"action": "deleted", "story_id": 7})
+            await dispatcher.drain()
+            await dispatcher.stop()
+
+        asyncio.run(scenario())
+        assert len(down.requests) == 3
+        assert len(rejecting.requests) == 1
+        record = json.loads((tmp_path / "down.jsonl").read_text().splitlines()[0])
+        assert record["reason"] == "HTTP 500"
+        assert record["request"]["json"] == {"action": "deleted", "story_id": 7}
+        assert json.loads((tmp_path / "rejecting.jsonl").read_text())["attempts"] == 1
+
+
+    def test_dead_letters_are_written_off_the_event_loop(self, servers, tmp_path, monkeypatch):
+        """Test that queue-full dead letters from dispatch() are written by a worker thread."""
+        slow = servers(statuses=(200,), delay=0.25)
+        writer_threads = []
+        original = _TargetRunner._append_dead_letters
+
+        def recording_append(runner, records):
+            writer_threads.append(threading.get_ident())
+            original(runner, records)
+
+        monkeypatch.setattr(_TargetRunner, "_append_dead_letters", recording_append)
+
+        async def scenario():
+            dispatcher = FanoutDispatcher([EchoTarget("slow", slow.url, concurrency=1, queue_size=1)],
+                                          dead_letter_dir=str(tmp_path))
+            await dispatcher.start()
+            for story_id in range(5):
+                dispatcher.dispatch({"action": "published", "story_id": story_id})
+            loop_thread = threading.get_ident()
+            await dispatcher.drain()
+            await dispatcher.stop()
+            return loop_thread
+
+        loop_thread = asyncio.run(scenario())
+        records = [json.loads(line) for line in (tmp_path / "slow.jsonl").read_text().splitlines()]
+        assert records and all(record["reason"] == "queue full" for record in records)
+        assert writer_threads and loop_thread not in writer_threads
+
+
+class TestTargets:
+    """Test how events map to outbound requests."""
+
+    def test_targets_must_build_requests(self):
+        """Test that DispatchTarget is abstract."""
+        with pytest.raises(TypeError):
+            DispatchTarget("incomplete")
+
+    def test_story_paths(self):
+        """Test route selection from content type or slug alone."""
+        cafe = {"full_slug": "demo-coffee-central", "story": {"content": {"body": [{"component": "cafe"}]}}}
+        assert story_paths(cafe) == ["/cafe/demo-coffee-central"]
+        assert story_paths({"full_slug": "events/roaster-talk"}) == ["/cafe/roaster-talk", "/event/roaster-talk"]
+        assert story_paths({}) == []
+
+    def test_revalidate_and_purge_requests(self):
+        """Test the payloads sent to Next.js and the CDN."""
+        event = {"action": "published", "full_slug": "roaster-talk",
+                 "story": {"content": {"body": [{"component": "event"}]}}}
+        revalidate = RevalidateTarget("http://next/api/revalidate", secret="s3cret").build_requests(event)
+        assert revalidate == [OutboundRequest("POST", "http://next/api/revalidate", json={"path": "/event/roaster-talk"},
+                                              headers={"x-revalidate-secret": "s3cret"})]
+        purge = CdnPurgeTarget("http://cdn/purge", site_url="https://brewbook.example/").build_requests(event)
+        assert purge[0].json == {"files": ["https://brewbook.example/event/roaster-talk"]}
@@ -0,0 +1,70 @@
+from facets import FacetIndex, facet_values
+
+CAFES = {
+    1: {"wifi": True, "power_outlets": True, "pet_friendly": True, "noise_level": "moderate", "price_range": "moderate"},
+    2: {"wifi": True, "outdoor_seating": True, "noise_level": "quiet", "price_range": "expensive"},
+    3: {"wifi": True, "power_outlets": True, "noise_level": "moderate", "price_range": "moderate"},
+    4: {"wifi": False, "noise_level": "moderate", "price_range": "budget"},
+}
+
+
+def build_index():
+    """Build a facet index over the sample cafés."""
+    index = FacetIndex()
+    for key, cafe in CAFES.items():
+        index.upsert(key, facet_values(cafe), slug=f"cafe-{key}")
+    return index
+
+
+class TestFacetIndex:
+    """Test bitmap filtering and facet counts."""
+
+    def test_and_across_fields_or_within_field(self):
+        """Test filter combination semantics."""
+        index = build_index()
+        result = index.search({"wifi": ["true"], "noise_level": ["quiet", "moderate"], "power_outlets": ["true"]})
+        assert result["nbHits"] == 2
+        assert {hit["id"] for hit in result["hits"]} == {1, 3}
+
+    def test_disjunctive_facet_counts(self):
+        """Test that a filtered field still counts its other values."""
+        counts = build_index().facet_counts({"noise_level": ["quiet"], "wifi": ["true"]})
+        assert counts["noise_level"] == {"quiet": 1, "moderate": 2}
+        assert counts["wifi"] == {"true": 1}
+        assert counts["price_range"] == {"expensive": 1}
+
+    def test_update_and_remove_reuse_rows(self):
+        """Test that updates move bits and removed rows are recycled."""
+        index = build_index()
+        index.upsert(4, facet_values({"wifi": True, "noise_level": "loud"}))
+        assert index.facet_counts()["noise_level"] == {"moderate": 2, "quiet": 1, "loud": 1}
+        assert "budget" not in index.facet_counts()["price_range"]
+
+        index.remove(2)
+        index.upsert(5, facet_values({"pet_friendly": True}))
+        assert len(index) == 4
+        assert index.search({"pet_friendly": ["true"]})["nbHits"] == 2
+        assert index.search({"outdoor_seating": ["true"]})["nbHits"] == 0
+
+
+class TestFacetsEndpoint:
+    """Test the /cafes/facets endpoint fed by webhooks."""
+
+    def test_webhook_story_is_filterable(self, client, post_webhook):
+        """Test that published cafés are filterable and deleted ones drop out."""
+        story = {"id": 8001, "slug": "latte-lab-experimental", "content": {"component": "page", "body": [
+            {"component": "cafe", "wifi": True, "outdoor_seating": True, "noise_level": "loud", "price_range": "expensive"},
+        ]}}
+        post_webhook({"action": "published", "story_id": 8001, "story": story})
+
+        response = client.get("/cafes/facets", params={"noise_level": "loud,quiet", "outdoor_seating": "true"})
+        assert response.status_code == 200
+        assert {"id": 8001, "slug": "latte-lab-experimental"} in response.json()["hits"]
+        assert response.json()["facets"]["noise_level"]["loud"] >= 1
+
+        response = client.get("/cafes/facets", params={"wifi": "", "noise_level": ",", "outdoor_seating": "true"})
+        assert {"id": 8001, "slug": "latte-lab-experimental"} in response.json()["hits"]
+
+        post_webhook({"action": "deleted", "story_id": 8001})
+        response = client.get("/cafes/facets", params={"noise_level": "loud", "outdoor_seating": "true"})
+        assert all(hit["id"] != 8001 for hit in response.json()["hits"])
@@ -0,0 +1,125 @@
+import math
+import random
+
+from geo_index import EARTH_RADIUS_KM, GeoIndex, parse_geo_location
+from normalizer import RecordNormalizer
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Reference haversine distance for brute-force comparisons."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def cafe_story(story_id, slug, geo_location):
+    """Build a minimal page story with a cafe blok."""
+    return {
+        "id": story_id,
+        "slug": slug,
+        "content": {"component": "page", "body": [{"component": "cafe", "geo_location": geo_location}]},
+    }
+
+
+class LookupCountingDict(dict):
+    """Dict that records the keys looked up with get()."""
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.looked_up = []
+
+    def get(self, key, default=None):
+        self.looked_up.append(key)
+        return super().get(key, default)
+
+
+class TestGeoIndex:
+    """Test the array-backed geo index."""
+
+    def test_parse_geo_location(self):
+        """Test parsing of Storyblok lat,lng strings."""
+        assert parse_geo_location("52.3676,4.9041") == (52.3676, 4.9041)
+        assert parse_geo_location(" 38.7223 , -9.1393 ") == (38.7223, -9.1393)
+        assert parse_geo_location("") is None
+        assert parse_geo_location("north,east") is None
+        assert parse_geo_location("91,0") is None
+
+    def test_queries_match_brute_force(self):
+        """Test k-nearest and radius queries against a brute-force scan, across the antimeridian."""
+        rng = random.Random(7)
+        index = GeoIndex(cell_degrees=0.5)
+        points = {}
+        for i in range(3000):
+            points[i] = (rng.uniform(-60, 70), rng.uniform(-180, 180))
+            index.upsert(i, *points[i])
+        for i in range(0, 3000, 4):
+            assert index.remove(i)
+            del points[i]
+
+        for query in [(52.37, 4.9), (0.0, 179.95), (-33.9, -179.9), (69.0, 100.0)]:
+            expected = sorted(points, key=lambda i: haversine_km(*query, *points[i]))
+            assert [hit["id"] for hit in index.nearest(*query, k=8)] == expected[:8]
+
+            within = {hit["id"] for hit in index.within(*query, 500)}
+            assert within == {i for i in points if haversine_km(*query, *points[i]) <= 500}
+
+    def test_nearest_matches_brute_force_on_sparse_and_polar_data(self):
+        """Test ring and best-first search against a brute-force scan, including odd cell sizes."""
+        rng = random.Random(11)
+        for cell_degrees in (0.7, 50.0):
+            index = GeoIndex(cell_degrees=cell_degrees)
+            points = {i: (rng.uniform(-90, 90), rng.uniform(-180, 180)) for i in range(300)}
+            for i, point in points.items():
+                index.upsert(i, *point)
+            for query in [(90.0, 0.0), (-89.9, 10.0), (45.0, 179.999), (0.0, -180.0), (12.0, 34.0)]:
+                expected = sorted(haversine_km(*query, *points[i]) for i in points)
+                assert [hit["distance_km"] for hit in index.nearest(*query, k=5)] == [round(d, 3) for d in expected[:5]]
+                within = [hit["distance_km"] for hit in index.within(*query, 2000, k=5)]
+                assert within == [round(d, 3) for d in expected[:5] if d <= 2000]
+
+    def test_far_queries_only_visit_nearby_cells(self):
+        """Test that a query far from every café computes distances for few of them."""
+        rng = random.Random(3)
+        index = GeoIndex()
+        for i in range(20000):
+            index.upsert(i, rng.uniform(35, 60), rng.uniform(-10, 30))
+        index._grid = LookupCountingDict(index._grid)
+
+        assert len(index.nearest(-40.0, -100.0, k=10)) == 10
+        visited = {cell for cell in index._grid.looked_up if cell in index._grid}
+        assert sum(len(index._grid[cell]) for cell in visited) < 500
+
+    def test_upsert_record_moves_and_skips(self):
+        """Test that records are re-indexed on move and dropped when geo data disappears."""
+        normalize = RecordNormalizer().normalize_story
+        index = GeoIndex.from_records([normalize(cafe_story(1, "demo-coffee-central", "52.3676,4.9041"))])
+        assert index.upsert_record(normalize(cafe_story(1, "demo-coffee-central", "48.8566,2.3522")))
+        assert len(index) == 1
+        assert index.nearest(48.85, 2.35, k=1)[0]["distance_km"] < 1
+
+        assert not index.upsert_record(normalize(cafe_story(1, "demo-coffee-central", "")))
+        assert 1 not in index
+
+
+class TestNearbyEndpoint:
+    """Test that webhooks feed the index behind /cafes/nearby."""
+
+    def test_webhook_story_content_is_queryable(self, client, post_webhook, worker_state):
+        """Test that published content is indexed and deleted stories are removed."""
+        story = cafe_story(9001, "cafe-aroma-artisan", "52.5200,13.4050")
+        assert post_webhook({"action": "published", "story_id": 9001, "story": story}).status_code == 200
+
+        response = client.get("/cafes/nearby", params={"lat": 52.52, "lng": 13.40, "radius_km": 5})
+        assert response.status_code == 200
+        assert [hit["slug"] for hit in response.json()["hits"]] == ["cafe-aroma-artisan"]
+
+        assert post_webhook({"action": "deleted", "story_id": 9001}).status_code == 200
+        assert 9001 not in worker_state.geo_index
+
+    def test_invalid_coordinates_rejected(self, client):
+        """Test that out-of-range query parameters are rejected."""
+        response = client.get("/cafes/nearby", params={"lat": 123, "lng": 0})
+        assert response.status_code == 422
+        response = client.get("/cafes/nearby", params={"lat": 0, "lng": 0, "radius_km": 5000})
+        assert response.status_code == 422
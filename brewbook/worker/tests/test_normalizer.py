@@ -0,0 +1,178 @@
+import json
+import os
+import shutil
+import subprocess
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from normalizer import RecordNormalizer, richtext_to_text, split_list
+
+
+def richtext(*paragraphs):
+    """Build a Storyblok richtext document."""
+    return {"type": "doc", "content": [
+        {"type": "paragraph", "content": [{"type": "text", "text": text}]} for text in paragraphs
+    ]}
+
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+NODE_NORMALIZER = os.path.join(os.path.dirname(__file__), "..", "..", "lib", "services", "RecordNormalizer.js")
+
+# Wednesday 2025-10-15 21:30 UTC
+WEDNESDAY_EVENING = datetime(2025, 10, 15, 21, 30, tzinfo=timezone.utc)
+
+
+def at_clock(moment):
+    """Build a normalizer whose clock is frozen at ``moment``."""
+    return RecordNormalizer(clock=lambda: moment)
+
+
+def cafe_story(**overrides):
+    """Build a café story shaped like the seeded content."""
+    cafe = {
+        "component": "cafe",
+        "title": "Café Aroma Artisan",
+        "description": richtext("An intimate artisan coffee house.", "Known for pour-over."),
+        "short_summary": "",
+        "address": "456 Bean Boulevard",
+        "city": "Berlin",
+        "geo_location": "52.5200,13.4050",
+        "opening_hours": richtext("Monday-Sunday: 8:00-22:00"),
+        "wifi": True,
+        "power_outlets": False,
+        "noise_level": "quiet",
+        "hero_image": {"filename": "https://img.example/hero.jpg"},
+        "gallery": [{"filename": "https://img.example/1.jpg"}, {"filename": ""}],
+        "tags": "hipster, late night,,artisan",
+        "price_range": "expensive",
+        "metadata": [{
+            "component": "metadata",
+            "tags": "ignored",
+            "rating": 4.8,
+            "specialties": "Chemex",
+            "ai_tags": "Berlin,quiet,expensive",
+            "open_now": True,
+        }],
+    }
+    cafe.update(overrides)
+    return {"id": 42, "slug": "cafe-aroma-artisan", "published_at": "2025-10-01T00:00:00Z",
+            "content": {"component": "page", "body": [cafe]}}
+
+
+class TestHelpers:
+    """Test richtext flattening and list splitting."""
+
+    def test_richtext_to_text(self):
+        """Test that paragraphs become lines and legacy strings pass through."""
+        assert richtext_to_text(richtext("a", "b")) == "a\nb"
+        assert richtext_to_text("  plain ") == "plain"
+        assert richtext_to_text("") == ""
+        assert richtext_to_text(None) == ""
+
+    def test_split_list(self):
+        """Test comma-separated splitting."""
+        assert split_list("study spot, wifi ,,hipster") == ["study spot", "wifi", "hipster"]
+        assert split_list(None) == []
+
+
+class TestRecordNormalizer:
+    """Test parity with the Node RecordNormalizer record shape."""
+
+    def test_cafe_record(self):
+        """Test flattening of a café story including metadata merge."""
+        record = at_clock(WEDNESDAY_EVENING).normalize_story(cafe_story())
+        assert record["objectID"] == "story_42"
+        assert record["type"] == "cafe"
+        assert record["description"] == "An intimate artisan coffee house.\nKnown for pour-over."
+        assert record["summary"] == record["description"]
+        assert record["opening_hours"] == "Monday-Sunday: 8:00-22:00"
+        assert record["location"] == "Berlin, 456 Bean Boulevard"
+        assert record["_geoloc"] == {"lat": 52.52, "lng": 13.405}
+        assert record["tags"] == ["hipster", "late night", "artisan"]
+        assert record["metadata"] == record["tags"]
+        assert record["ai_tags"] == ["Berlin", "quiet", "expensive"]
+        assert record["gallery"] == ["https://img.example/1.jpg"]
+        assert record["hero_image"] == "https://img.example/hero.jpg"
+        assert "image" not in record
+        assert record["wifi"] is True and record["pet_friendly"] is False
+        assert record["specialties"] == "Chemex"
+        assert record["rating"] == 4.8 and record["open_now"] is True
+
+    def test_metadata_fills_gaps_only(self):
+        """Test fallbacks to metadata and defaults without metadata."""
+        record = RecordNormalizer().normalize_story(cafe_story(tags="", opening_hours=None, geo_location="bad"))
+        assert record["tags"] == ["ignored"]
+        assert record["opening_hours"] == ""
+        assert "_geoloc" not in record and "geo_location" not in record
+
+        record = RecordNormalizer().normalize_story(cafe_story(metadata=[], opening_hours=None))
+        assert record["rating"] is None and record["open_now"] is False and record["ai_tags"] == []
+
+    def test_open_now_follows_hours_in_cafe_timezone(self):
+        """Test that open_now is computed from the hours at café-local time, not copied from metadata."""
+        normalizer = at_clock(WEDNESDAY_EVENING)
+        # 21:30 UTC is 23:30 in Berlin, after the 22:00 close...
+        assert normalizer.normalize_story(cafe_story(timezone="Europe/Berlin"))["open_now"] is False
+        # ...and 17:30 in New York
+        assert normalizer.normalize_story(cafe_story(timezone="America/New_York"))["open_now"] is True
+        # Unparseable hours fall back to the metadata flag
+        assert normalizer.normalize_story(cafe_story(opening_hours="ask the barista"))["open_now"] is True
+
+    def test_event_and_unknown_stories(self):
+        """Test event records and skipping of stories without a record component."""
+        normalizer = RecordNormalizer()
+        event = {"id": 7, "slug": "roaster-talk", "content": {"component": "page", "body": [
+            {"component": "event", "title": "Roaster Talk", "description": richtext("Join us!"),
+             "date": "2025-10-15T18:00:00+00:00", "location": "Paris, FR"},
+        ]}}
+        record = normalizer.normalize_story(event)
+        assert record["type"] == "event"
+        assert record["summary"] == "Join us!"
+        assert record["date"] == "2025-10-15T18:00:00+00:00"
+        assert normalizer.normalize_stories([event, {"id": 8, "content": {"component": "page", "body": []}}]) == [record]
+        assert normalizer.normalize_story({"id": 9, "content": "oops"}) is None
+        assert normalizer.normalize_story({"content": event["content"]}) is None
+
+    def test_plans_are_compiled_once(self):
+        """Test that field plans are cached and normalization is fast enough for webhook bursts."""
+        normalizer = RecordNormalizer()
+        assert normalizer.plan_for("cafe") is normalizer.plan_for("cafe")
+
+        story = cafe_story()
+        started = time.perf_counter()
+        for _ in range(2000):
+            normalizer.normalize_story(story)
+        assert time.perf_counter() - started < 1.0
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node is not installed")
+class TestNodeParity:
+    """Test that the Python and Node normalizers build identical records."""
+
+    def test_shared_fixture(self):
+        """Test both normalizers on the same stories, field by field."""
+        path = os.path.join(FIXTURES, "normalizer_stories.json")
+        with open(path) as f:
+            stories = json.load(f)
+        script = (
+            "import fs from 'fs';"
+            f"import RecordNormalizer from {json.dumps(os.path.abspath(NODE_NORMALIZER))};"
+            "const normalizer = new RecordNormalizer();"
+            f"const stories = JSON.parse(fs.readFileSync({json.dumps(path)}, 'utf8'));"
+            "process.stdout.write(JSON.stringify(stories.map(story => normalizer.normalizeStory(story))));"
+        )
+        result = subprocess.run(["node", "--input-type=module", "-e", script],
+                                capture_output=True, text=True, timeout=30)
+        assert result.returncode == 0, result.stderr
+        node_records = json.loads(result.stdout)
+
+        # Python derives open_now from the hours; at this time every café is
+        # closed, matching the metadata value Node copies
+        python_records = at_clock(WEDNESDAY_EVENING).normalize_stories(stories)
+        assert len(python_records) == len(node_records) == len(stories)
+        for python_record, node_record in zip(python_records, node_records):
+            assert python_record == node_record
+        assert python_records[0]["ai_tags"] == ["cozy", "laptop friendly"]
+        assert python_records[1]["ai_tags"] == []
@@ -0,0 +1,214 @@
+import random
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from opening_hours import (OpeningHoursIndex, bitmap_rows, is_open_at, open_now_state, parse_opening_hours,
+                           refresh_open_now)
+
+# 2025-10-06 is a Monday
+MONDAY = datetime(2025, 10, 6)
+
+
+def at(day_offset, hour, minute=0):
+    """Build a wall-clock datetime relative to MONDAY."""
+    return MONDAY.replace(day=MONDAY.day + day_offset, hour=hour, minute=minute)
+
+
+class TestParseOpeningHours:
+    """Test compiling free-text hours into minute-of-week intervals."""
+
+    def test_seed_format(self):
+        """Test the format used by the seeded cafés."""
+        intervals = parse_opening_hours("Monday-Friday: 6:00-18:00, Saturday: 8:00-16:00, Sunday: Closed")
+        assert is_open_at(intervals, at(0, 6))
+        assert not is_open_at(intervals, at(0, 18))
+        assert is_open_at(intervals, at(5, 15, 59))
+        assert not is_open_at(intervals, at(6, 12))
+
+    def test_later_segments_override_and_ranges_wrap(self):
+        """Test per-day overrides and week-wrapping day ranges."""
+        intervals = parse_opening_hours("Daily: 7am-3pm; Sunday: Closed")
+        assert is_open_at(intervals, at(2, 14, 30))
+        assert not is_open_at(intervals, at(6, 10))
+
+        intervals = parse_opening_hours("Saturday-Monday: 10:00-12:00")
+        assert is_open_at(intervals, at(0, 11))
+        assert not is_open_at(intervals, at(1, 11))
+
+    def test_split_shifts_continue_previous_days(self):
+        """Test that a segment starting with a time adds a shift to the previous days."""
+        intervals = parse_opening_hours("Monday-Friday: 7:00-12:00, 13:00-19:00, Saturday: 9:00-14:00")
+        assert is_open_at(intervals, at(0, 8))
+        assert not is_open_at(intervals, at(2, 12, 30))
+        assert is_open_at(intervals, at(4, 18, 59))
+        assert not is_open_at(intervals, at(5, 15))
+
+    def test_past_midnight_spills_into_next_day(self):
+        """Test overnight hours, including Sunday night into Monday."""
+        intervals = parse_opening_hours("Sunday: 22:00-2:00")
+        assert is_open_at(intervals, at(6, 23))
+        assert is_open_at(intervals, at(0, 1, 59))
+        assert not is_open_at(intervals, at(0, 2))
+
+    def test_richtext_input(self):
+        """Test that Storyblok richtext documents are flattened before parsing."""
+        richtext = {"type": "doc", "content": [
+            {"type": "paragraph", "content": [{"type": "text", "text": "Tuesday-Sunday: 9:00-17:00"}]},
+            {"type": "paragraph", "content": [{"type": "text", "text": "Monday: Closed"}]},
+        ]}
+        intervals = parse_opening_hours(richtext)
+        assert not is_open_at(intervals, at(0, 10))
+        assert is_open_at(intervals, at(1, 10))
+
+
+class TestOpeningHoursIndex:
+    """Test the weekly bitmap index."""
+
+    def test_open_at_matches_per_cafe_check(self):
+        """Test that the index agrees with per-café interval checks at every quarter hour."""
+        hours = {
+            1: "Monday-Friday: 7:00-19:00, Saturday-Sunday: 8:00-20:00",
+            2: "Tuesday-Sunday: 9:00-17:00, Monday: Closed",
+            3: "Friday-Saturday: 18:00-2:00",
+            4: "Monday-Sunday: 7:30-19:30",
+        }
+        index = OpeningHoursIndex()
+        for key, text in hours.items():
+            index.upsert(key, text)
+        index.remove(4)
+        index.upsert(5, "Weekends: 24 hours")
+
+        compiled = {key: parse_opening_hours(text) for key, text in hours.items() if key != 4}
+        compiled[5] = parse_opening_hours("Weekends: 24 hours")
+        for day in range(7):
+            for minute in range(0, 24 * 60, 15):
+                moment = at(day, minute // 60, minute % 60)
+                expected = {key for key, intervals in compiled.items() if is_open_at(intervals, moment)}
+                assert {hit["id"] for hit in index.open_at(moment)} == expected
+
+    def test_next_change(self):
+        """Test that next_change points at the next opening or closing time."""
+        index = OpeningHoursIndex()
+        index.upsert("a", "Monday-Friday: 7:00-19:00")
+        assert index.next_change(at(0, 12)) == at(0, 19)
+        assert index.next_change(at(4, 20)) == at(7, 0)
+
+    def test_incremental_updates_match_per_cafe_checks_across_zones(self):
+        """Test that many upserts, moves and removals leave the same answers as evaluating each café."""
+        rng = random.Random(28)
+        zones = ["Europe/Lisbon", "Asia/Tokyo", "America/New_York", None]
+        texts = ["Daily: 8:00-18:00", "Monday-Friday: 7:00-12:00, 13:00-19:00", "Friday-Saturday: 18:00-2:00",
+                 "Weekends: 24 hours", "Tuesday-Sunday: 9:00-17:00, Monday: Closed", ""]
+        index = OpeningHoursIndex()
+        cafes = {}
+        for _ in range(300):
+            key = rng.randrange(40)
+            if rng.random() < 0.2:
+                index.remove(key)
+                cafes.pop(key, None)
+            else:
+                cafes[key] = (rng.choice(texts), rng.choice(zones))
+                index.upsert(key, cafes[key][0], timezone_name=cafes[key][1])
+        assert len(index) == len(cafes)
+
+        start = datetime(2025, 10, 6, tzinfo=timezone.utc)
+        for step in range(0, 7 * 24 * 60, 45):
+            moment = start + timedelta(minutes=step)
+            expected = {key for key, (text, zone) in cafes.items() if open_now_state(text, zone, moment)[0]}
+            assert {hit["id"] for hit in index.open_at(moment)} == expected
+
+    def test_cafes_are_judged_on_their_own_clock(self):
+        """Test that an aware moment is converted into each café's timezone."""
+        index = OpeningHoursIndex()
+        index.upsert("lisbon", "Daily: 8:00-18:00", timezone_name="Europe/Lisbon")
+        index.upsert("tokyo", "Daily: 8:00-18:00", timezone_name="Asia/Tokyo")
+
+        morning = datetime(2025, 10, 6, 9, 0, tzinfo=timezone.utc)  # 10:00 Lisbon, 18:00 Tokyo
+        assert [hit["id"] for hit in index.open_at(morning)] == ["lisbon"]
+        # Lisbon closes at 17:00 UTC, before Tokyo reopens at 23:00 UTC
+        assert index.next_change(morning) == datetime(2025, 10, 6, 17, 0, tzinfo=timezone.utc)
+        late = datetime(2025, 10, 6, 23, 30, tzinfo=timezone.utc)  # 00:30 Lisbon, 08:30 Tokyo
+        assert [hit["id"] for hit in index.open_at(late)] == ["tokyo"]
+        assert index.open_at(datetime(2025, 10, 6, 9, 0, tzinfo=ZoneInfo("Asia/Tokyo"))) == [
+            {"id": "tokyo", "slug": None}]
+
+    def test_search_limits_hits_but_counts_all(self):
+        """Test that search caps the decoded hits and still reports the full count."""
+        index = OpeningHoursIndex()
+        for key in range(50):
+            index.upsert(key, "Daily: 24 hours")
+        result = index.search(at(0, 12), limit=10)
+        assert result["nbHits"] == 50
+        assert [hit["id"] for hit in result["hits"]] == list(range(10))
+
+    def test_bitmap_rows(self):
+        """Test bitmap decoding in ascending order with an optional limit."""
+        bitmap = (1 << 0) | (1 << 9) | (1 << 64) | (1 << 1000)
+        assert list(bitmap_rows(bitmap)) == [0, 9, 64, 1000]
+        assert list(bitmap_rows(bitmap, limit=2)) == [0, 9]
+        assert list(bitmap_rows(0)) == []
+
+
+class TestOpenNowRefresh:
+    """Test café-local open_now evaluation and scheduled refresh planning."""
+
+    def test_open_now_state_uses_cafe_timezone(self):
+        """Test that the state and next change are evaluated on the café's wall clock."""
+        now = datetime(2025, 10, 13, 6, 30, tzinfo=timezone.utc)  # Monday 08:30 in Berlin
+        is_open, change = open_now_state("Monday-Friday: 8:00-18:00", "Europe/Berlin", now)
+        assert is_open is True
+        assert change == datetime(2025, 10, 13, 16, 0, tzinfo=timezone.utc)
+        assert open_now_state("Monday-Friday: 8:00-18:00", "Europe/London", now)[0] is False
+        assert open_now_state("", "Europe/Berlin", now) == (None, None)
+
+    def test_refresh_reports_flips_and_earliest_change(self):
+        """Test that only flipped records are updated and the next wake-up is the earliest change."""
+        now = datetime(2025, 10, 13, 6, 30, tzinfo=timezone.utc)
+        records = [
+            {"objectID": "story_1", "opening_hours": "Daily: 8:00-18:00", "timezone": "Europe/Berlin", "open_now": False},
+            {"objectID": "story_2", "opening_hours": "Daily: 8:00-18:00", "timezone": "Europe/Lisbon", "open_now": False},
+            {"objectID": "story_3", "opening_hours": "", "open_now": True},
+        ]
+        updates, next_change = refresh_open_now(records, now)
+        assert updates == [{"objectID": "story_1", "open_now": True}]
+        # Lisbon opens at 07:00 UTC, before Berlin closes
+        assert next_change == datetime(2025, 10, 13, 7, 0, tzinfo=timezone.utc)
+
+
+class TestOpenEndpoint:
+    """Test the /cafes/open endpoint fed by webhooks."""
+
+    def test_webhook_story_hours_are_queryable(self, client, post_webhook):
+        """Test that published café hours show up and unpublished cafés disappear."""
+        story = {"id": 7001, "slug": "pour-over-place-artisan", "content": {"component": "page", "body": [
+            {"component": "cafe", "opening_hours": "Tuesday-Sunday: 9:00-17:00, Monday: Closed"},
+        ]}}
+        post_webhook({"action": "published", "story_id": 7001, "story": story})
+
+        response = client.get("/cafes/open", params={"at": at(1, 10).isoformat()})
+        assert response.status_code == 200
+        assert {"id": 7001, "slug": "pour-over-place-artisan"} in response.json()["hits"]
+        assert response.json()["next_change"] == at(1, 17).isoformat()
+
+        post_webhook({"action": "unpublished", "story_id": 7001})
+        response = client.get("/cafes/open", params={"at": at(1, 10).isoformat()})
+        assert all(hit["id"] != 7001 for hit in response.json()["hits"])
+
+    def test_offsets_are_converted_per_cafe_timezone(self, client, post_webhook):
+        """Test that an ?at= with an offset is judged on each café's local clock."""
+        for story_id, slug, zone in [(7101, "lisbon-beans", "Europe/Lisbon"), (7102, "tokyo-drip", "Asia/Tokyo")]:
+            story = {"id": story_id, "slug": slug, "content": {"component": "page", "body": [
+                {"component": "cafe", "opening_hours": "Daily: 8:00-18:00", "timezone": zone},
+            ]}}
+            assert post_webhook({"action": "published", "story_id": story_id, "story": story}).status_code == 200
+
+        response = client.get("/cafes/open", params={"at": "2025-10-06T09:00:00+00:00"})
+        assert [hit["slug"] for hit in response.json()["hits"]] == ["lisbon-beans"]
+        assert response.json()["nbHits"] == 1
+        assert response.json()["next_change"] == "2025-10-06T17:00:00+00:00"
+
+        response = client.get("/cafes/open", params={"at": "2025-10-06T23:30:00+00:00"})
+        assert [hit["slug"] for hit in response.json()["hits"]] == ["tokyo-drip"]
+
+        response = client.get("/cafes/open", params={"at": "2025-10-06T09:00:00+00:00", "limit": 0})
+        assert response.json()["hits"] == [] and response.json()["nbHits"] == 1
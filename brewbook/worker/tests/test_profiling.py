@@ -0,0 +1,88 @@
+import threading
+
+from profiling import SamplingProfiler, StageHistograms, StageTimer
+
+
+def parse_server_timing(header):
+    """Parse a Server-Timing header into {stage: duration_ms}."""
+    stages = {}
+    for item in header.split(","):
+        name, duration = item.strip().split(";dur=")
+        stages[name] = float(duration)
+    return stages
+
+
+class TestStageTiming:
+    """Test Server-Timing headers and stage histograms."""
+
+    def test_webhook_reports_stages(self, client, post_webhook):
+        """Test that a verified webhook reports every processing stage."""
+        response = post_webhook({"action": "published", "story_id": 123})
+
+        stages = parse_server_timing(response.headers["server-timing"])
+        assert {"body", "hmac", "json", "log", "apply", "total"} <= set(stages)
+        assert stages["total"] >= stages["hmac"]
+
+        snapshot = client.get("/debug/stages").json()
+        assert snapshot["hmac"]["count"] >= 1
+        assert snapshot["total"]["p99_ms"] is not None
+
+    def test_stages_endpoint_is_opt_in(self, client, worker_state, monkeypatch):
+        """Test that the stage histograms are hidden unless enabled."""
+        monkeypatch.setattr(worker_state, "STAGE_TIMING_ENABLED", False)
+        assert client.get("/debug/stages").status_code == 404
+
+    def test_other_routes_get_total_only(self, client):
+        """Test that uninstrumented routes still get a total stage."""
+        response = client.get("/health")
+        assert list(parse_server_timing(response.headers["server-timing"])) == ["total"]
+
+    def test_histogram_percentiles(self):
+        """Test that percentiles come from bucket upper bounds."""
+        histograms = StageHistograms()
+        timer = StageTimer()
+        for _ in range(98):
+            timer.add("hmac", 0.015)
+        timer.add("hmac", 3.0)
+        timer.add("hmac", 3.0)
+        histograms.observe_timer(timer)
+
+        summary = histograms.snapshot()["hmac"]
+        assert summary["count"] == 100
+        assert summary["p50_ms"] == 0.02
+        assert 3.0 <= summary["p99_ms"] <= 6.0
+
+
+class TestSamplingProfiler:
+    """Test the collapsed-stack sampling profiler."""
+
+    def test_capture_sees_busy_thread(self):
+        """Test that a busy thread's function shows up in collapsed stacks."""
+        stop = threading.Event()
+
+        def brew_busy_loop():
+            while not stop.is_set():
+                sum(range(1000))
+
+        worker = threading.Thread(target=brew_busy_loop)
+        worker.start()
+        try:
+            output = SamplingProfiler().capture(seconds=0.2, interval=0.002)
+        finally:
+            stop.set()
+            worker.join()
+
+        lines = output.strip().splitlines()
+        assert any("brew_busy_loop" in line for line in lines)
+        stack, count = lines[0].rsplit(" ", 1)
+        assert int(count) > 0 and ";" in stack
+
+    def test_endpoint_is_opt_in(self, client, worker_state, monkeypatch):
+        """Test that the profile endpoint is hidden unless enabled."""
+        assert client.get("/debug/profile", params={"seconds": 0.05}).status_code == 404
+
+        monkeypatch.setattr(worker_state, "PROFILER_ENABLED", True)
+        response = client.get("/debug/profile", params={"seconds": 0.05, "interval_ms": 1})
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert response.text.strip()
@@ -0,0 +1,77 @@
+import pytest
+
+from normalizer import RecordNormalizer
+from reconcile import DIGEST_ATTRIBUTE, plan_reconcile, record_digest
+
+
+def story(story_id, title):
+    """Build a minimal café story."""
+    return {"id": story_id, "slug": f"cafe-{story_id}", "content": {"component": "page", "body": [
+        {"component": "cafe", "title": title, "city": "Amsterdam"},
+    ]}}
+
+
+def indexed(stories):
+    """Digests as the index would store them after a full sync."""
+    normalize = RecordNormalizer().normalize_story
+    return {f"story_{s['id']}": record_digest(normalize(s)) for s in stories}
+
+
+class TestRecordDigest:
+    """Test content digests."""
+
+    def test_digest_ignores_key_order_and_digest_attribute(self):
+        """Test that stored records hash the same as fresh ones."""
+        record = {"objectID": "story_1", "title": "A", "tags": ["x"]}
+        stored = {"tags": ["x"], DIGEST_ATTRIBUTE: "old", "title": "A", "objectID": "story_1"}
+        assert record_digest(record) == record_digest(stored)
+        assert record_digest(record) != record_digest({**record, "title": "B"})
+
+
+class TestPlanReconcile:
+    """Test drift detection between Storyblok and the index."""
+
+    def test_in_sync_space_needs_no_writes(self):
+        """Test that an up-to-date index yields an empty plan."""
+        stories = [story(i, f"Café {i}") for i in range(50)]
+        plan = plan_reconcile(iter(stories), indexed(stories))
+        assert plan.drift == 0
+        assert plan.checked == 50
+        assert list(plan.batches()) == []
+
+    def test_missing_stale_and_orphaned(self):
+        """Test that only drifted records are emitted, with digests attached."""
+        stories = [story(i, f"Café {i}") for i in range(10)]
+        digests = indexed(stories[:8])
+        digests["story_3"] = "outdated"
+        digests["story_99"] = "deleted-in-storyblok"
+        events = {"id": 100, "slug": "roaster-talk", "content": {"component": "page", "body": []}}
+
+        plan = plan_reconcile(iter(stories + [events]), digests)
+        assert [r["objectID"] for r in plan.missing] == ["story_8", "story_9"]
+        assert [r["objectID"] for r in plan.stale] == ["story_3"]
+        assert plan.orphaned == ["story_99"]
+        assert plan.summary() == {"checked": 10, "missing": 2, "stale": 1, "orphaned": 1}
+        assert plan.stale[0][DIGEST_ATTRIBUTE] == record_digest(plan.stale[0])
+
+    def test_batches(self):
+        """Test that fixes are chunked into Algolia batch operations."""
+        stories = [story(i, f"Café {i}") for i in range(5)]
+        plan = plan_reconcile(stories, {"story_42": None})
+        batches = list(plan.batches(size=4))
+        assert [len(batch) for batch in batches] == [4, 2]
+        assert batches[0][0]["action"] == "updateObject"
+        assert batches[-1][-1] == {"action": "deleteObject", "body": {"objectID": "story_42"}}
+        with pytest.raises(ValueError):
+            list(plan.batches(size=0))
+
+    def test_mass_orphaning_is_flagged(self):
+        """Test that a truncated story listing is not taken as mass deletion."""
+        stories = [story(i, f"Café {i}") for i in range(100)]
+        digests = indexed(stories)
+        assert not plan_reconcile(stories[:95], digests).orphans_implausible()
+
+        plan = plan_reconcile(stories[:40], digests)
+        assert plan.orphans_implausible()
+        assert plan.without_orphans().drift == 0
+        assert plan_reconcile([], digests).orphans_implausible()
@@ -0,0 +1,172 @@
+import asyncio
+import glob
+import gzip
+import hashlib
+import hmac
+import os
+
+import pytest
+
+from replay import parse_speed, replay
+from traffic_capture import CaptureWriter, CapturedRequest, read_capture
+
+FIXTURES = sorted(glob.glob(os.path.join(os.path.dirname(__file__), "fixtures", "*.wcap")))
+
+
+def signed(body, arrival):
+    """Build a captured request signed with the test secret."""
+    signature = hmac.new(b"test_secret_123", body, hashlib.sha256).hexdigest()
+    return CapturedRequest(arrival, {"webhook-signature": signature}, body)
+
+
+class TestCaptureFormat:
+    """Test writing and reading capture files."""
+
+    def test_round_trip_and_append(self, tmp_path):
+        """Test that records survive a round trip and appends extend the file."""
+        path = str(tmp_path / "traffic.wcap")
+        writer = CaptureWriter(path)
+        writer.record(1.5, {"webhook-signature": "abc", "Host": "example.com"}, b'{"action": "published"}')
+        writer.close()
+        writer = CaptureWriter(path)
+        writer.record(2.25, {}, b"")
+        writer.close()
+
+        records = list(read_capture(path))
+        assert records == [
+            CapturedRequest(1.5, {"webhook-signature": "abc"}, b'{"action": "published"}'),
+            CapturedRequest(2.25, {}, b""),
+        ]
+
+    def test_rejects_foreign_files(self, tmp_path):
+        """Test that files without the capture magic raise ValueError."""
+        foreign = tmp_path / "foreign.wcap"
+        with gzip.open(foreign, "wb") as f:
+            f.write(b"not a capture")
+        with pytest.raises(ValueError):
+            list(read_capture(str(foreign)))
+
+    def test_unclosed_capture_is_readable(self, tmp_path):
+        """Test that a still-open (or crashed) writer's records can be read up to the last one."""
+        path = str(tmp_path / "traffic.wcap")
+        writer = CaptureWriter(path)
+        for i in range(3):
+            writer.record(float(i), {}, b"x" * 100)
+        writer.flush()
+
+        assert [record.arrival for record in read_capture(path)] == [0.0, 1.0, 2.0]
+        writer.close()
+
+    def test_torn_last_record_is_skipped(self, tmp_path):
+        """Test that a partially written final record ends the capture cleanly."""
+        path = str(tmp_path / "traffic.wcap")
+        writer = CaptureWriter(path)
+        writer.record(1.0, {}, b"complete")
+        writer.flush()
+        size = os.path.getsize(path)
+        writer.record(2.0, {}, os.urandom(4096))
+        writer.flush()
+        with open(path, "r+b") as f:
+            f.truncate(size + 100)
+
+        assert [record.body for record in read_capture(path)] == [b"complete"]
+        writer.close()
+
+    def test_record_does_not_wait_for_the_writer(self, tmp_path):
+        """Test that a full queue drops records instead of blocking the handler."""
+        writer = CaptureWriter(str(tmp_path / "traffic.wcap"), max_pending=1)
+        for i in range(200):
+            writer.record(float(i), {}, b"x" * 1000)
+        writer.close()
+
+        assert writer.count + writer.dropped == 200
+        assert len(list(read_capture(writer.path))) == writer.count
+
+
+class TestCaptureMode:
+    """Test that the webhook endpoint records verified requests."""
+
+    def test_only_verified_requests_are_captured(self, client, worker_state, tmp_path, monkeypatch):
+        """Test that verified requests are recorded and rejected ones are not."""
+        path = str(tmp_path / "traffic.wcap")
+        writer = CaptureWriter(path)
+        monkeypatch.setattr(worker_state, "capture_writer", writer)
+
+        body = b'{"action": "published", "story_id": 123}'
+        signature = hmac.new(b"test_secret_123", body, hashlib.sha256).hexdigest()
+        assert client.post("/webhooks/storyblok", content=body, headers={"webhook-signature": signature}).status_code == 200
+        assert client.post("/webhooks/storyblok", content=body, headers={"webhook-signature": "0" * 64}).status_code == 400
+        writer.close()
+
+        records = list(read_capture(path))
+        assert len(records) == 1
+        assert records[0].body == body
+        assert records[0].headers["webhook-signature"] == signature
+
+
+class TestReplay:
+    """Test re-driving captured traffic through the app."""
+
+    def test_parse_speed(self):
+        """Test the --speed argument forms."""
+        assert parse_speed("max") == 0.0
+        assert parse_speed("1") == 1.0
+        assert parse_speed("10x") == 10.0
+
+    def test_speed_scales_original_timing(self, worker_state):
+        """Test that Nx replay compresses the original gaps by N."""
+        requests = [signed(b'{"action": "published", "story_id": %d}' % i, 1000.0 + i * 0.1) for i in range(5)]
+        report = asyncio.run(replay(worker_state.app, requests, speed=4))
+        assert report["statuses"] == {"200": 5}
+        assert report["captured_span_s"] == 0.4
+        # The last request is not sent before its scaled arrival (0.4s / 4);
+        # no upper bound, which would depend on the machine's load
+        assert report["elapsed_s"] >= 0.09
+
+    def test_streams_with_bounded_concurrency(self):
+        """Test that requests are pulled lazily and never exceed the concurrency limit."""
+        counts = {"active": 0, "max_active": 0, "done": 0}
+
+        async def app(scope, receive, send):
+            counts["active"] += 1
+            counts["max_active"] = max(counts["max_active"], counts["active"])
+            await asyncio.sleep(0.001)
+            counts["active"] -= 1
+            counts["done"] += 1
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        def stream():
+            for i in range(100):
+                # The next request is only read once a slot is about to free up
+                assert i - counts["done"] <= 5
+                yield CapturedRequest(float(i), {}, b"{}")
+
+        report = asyncio.run(replay(app, stream(), speed=0, concurrency=4))
+        assert report["statuses"] == {"200": 100}
+        assert counts["max_active"] <= 4
+
+    def test_resign_fixes_foreign_signatures(self, worker_state):
+        """Test that --resign lets captures from another secret replay cleanly."""
+        body = b'{"action": "published", "story_id": 1}'
+        requests = [CapturedRequest(0.0, {"webhook-signature": "f" * 64}, body)]
+        assert asyncio.run(replay(worker_state.app, requests, speed=0))["statuses"] == {"400": 1}
+        report = asyncio.run(replay(worker_state.app, requests, speed=0, resign_secret="test_secret_123"))
+        assert report["statuses"] == {"200": 1}
+
+
+class TestCapturedBursts:
+    """Replay every captured burst in tests/fixtures as a performance regression check."""
+
+    # Generous floor so slow CI machines pass; local runs are well above it
+    MIN_THROUGHPUT_RPS = 100
+
+    @pytest.mark.parametrize("path", FIXTURES, ids=os.path.basename)
+    def test_burst_replays_at_max_speed(self, worker_state, path):
+        """Test that a burst is accepted in full and clears the throughput floor."""
+        count = sum(1 for _ in read_capture(path))
+        report = asyncio.run(replay(worker_state.app, read_capture(path), speed=0))
+
+        assert report["requests"] == count
+        assert report["statuses"] == {"200": count}
+        assert report["throughput_rps"] >= self.MIN_THROUGHPUT_RPS
@@ -0,0 +1,45 @@
+from slugs import find_collisions, slugify, unique_slugs
+
+
+class TestSlugify:
+    """Test Unicode folding and punctuation handling."""
+
+    def test_accented_characters_are_folded(self):
+        """Test that accents outside the old é/ü/ä/ö set are folded too."""
+        assert slugify("Café Aroma Artisan") == "cafe-aroma-artisan"
+        assert slugify("São João Çafé") == "sao-joao-cafe"
+        assert slugify("Dvořák Řezno") == "dvorak-rezno"
+
+    def test_special_letters_are_transliterated(self):
+        """Test letters that NFKD cannot decompose."""
+        assert slugify("Straße Kaffee") == "strasse-kaffee"
+        assert slugify("Smørrebrød Łódź") == "smorrebrod-lodz"
+
+    def test_ampersand_and_whitespace(self):
+        """Test that '&' becomes 'and' and runs of separators collapse."""
+        assert slugify("Bean & Byte Tech Café") == "bean-and-byte-tech-cafe"
+        assert slugify("  Mocha   Market -- Variety  ") == "mocha-market-variety"
+
+
+class TestUniqueSlugs:
+    """Test batch collision detection and resolution."""
+
+    def test_find_collisions(self):
+        """Test that names folding to the same slug are grouped."""
+        collisions = find_collisions(["Café Roma", "Cafe Roma", "Drip District"])
+        assert collisions == {"cafe-roma": ["Café Roma", "Cafe Roma"]}
+
+    def test_collisions_get_numeric_suffixes(self):
+        """Test that duplicates are made unique in input order."""
+        slugs = unique_slugs(["Café Roma", "Cafe Roma", "CAFE ROMA"])
+        assert slugs == ["cafe-roma", "cafe-roma-2", "cafe-roma-3"]
+
+    def test_suffix_skips_existing_slugs(self):
+        """Test that generated suffixes never clash with taken or literal slugs."""
+        slugs = unique_slugs(["Cafe Roma", "Cafe Roma 2", "Café Roma"], taken=["cafe-roma-3"])
+        assert slugs == ["cafe-roma", "cafe-roma-2", "cafe-roma-4"]
+        assert len(set(slugs)) == len(slugs)
+
+    def test_empty_name_gets_placeholder(self):
+        """Test that names without any ASCII-foldable characters still get a slug."""
+        assert unique_slugs(["☕", "☕"]) == ["untitled", "untitled-2"]
@@ -0,0 +1,260 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from story_cache import StoryCache, StoryFetcher, etag_matches
+
+
+def make_story(story_id, slug, text="Join us!"):
+    """Build a minimal story payload."""
+    return {"id": story_id, "slug": slug, "full_slug": slug, "content": {"component": "page", "text": text}}
+
+
+class TestStoryCache:
+    """Test the bounded story cache and its SQLite tier."""
+
+    def test_lookup_by_id_and_slug(self):
+        """Test that entries are reachable by id and by slug."""
+        cache = StoryCache()
+        entry = cache.put(make_story(1, "latte-art-workshop"))
+        assert cache.get(1) is entry
+        assert cache.get("latte-art-workshop") is entry
+        assert json.loads(entry.body)["story"]["id"] == 1
+
+    def test_story_without_id_is_rejected(self):
+        """Test that stories without an integer id cannot be cached."""
+        with pytest.raises(ValueError):
+            StoryCache().put({"slug": "no-id", "content": {}})
+
+    def test_lru_eviction_by_entries_and_bytes(self):
+        """Test that the least recently used entries are evicted first."""
+        cache = StoryCache(max_entries=2)
+        cache.put(make_story(1, "a"))
+        cache.put(make_story(2, "b"))
+        cache.get(1)
+        cache.put(make_story(3, "c"))
+        assert cache.get(2) is None and cache.get("b") is None
+        assert cache.get(1) is not None
+
+        entry_size = len(cache.get(3).body)
+        cache = StoryCache(max_bytes=entry_size * 2)
+        for story_id in range(4, 9):
+            cache.put(make_story(story_id, chr(ord("a") + story_id)))
+        assert len(cache) == 2
+        assert cache.size_bytes <= entry_size * 2
+        assert cache.get(8) is not None and cache.get(4) is None
+
+    def test_invalidate_by_slug_only(self):
+        """Test that a slug-only invalidation removes the entry."""
+        cache = StoryCache()
+        cache.put(make_story(1, "roaster-talk"))
+        assert cache.invalidate(slug="roaster-talk")
+        assert cache.get(1) is None
+
+    def test_sqlite_tier_survives_restart(self, tmp_path):
+        """Test that entries persist on disk and invalidation reaches the disk tier."""
+        db_path = str(tmp_path / "stories.db")
+        cache = StoryCache(db_path=db_path)
+        cache.put(make_story(1, "a"))
+        cache.put(make_story(2, "b"))
+        cache.invalidate(story_id=2)
+        cache.close()
+
+        reopened = StoryCache(db_path=db_path)
+        assert reopened.get("a").story_id == 1
+        assert reopened.get(2) is None
+        reopened.close()
+
+    def test_disk_tier_is_trimmed_oldest_first(self, tmp_path):
+        """Test that the tracked row count keeps the disk tier at its bound across replaces and restarts."""
+        db_path = str(tmp_path / "stories.db")
+        cache = StoryCache(db_path=db_path, max_disk_entries=3)
+        for story_id in range(1, 4):
+            cache.put(make_story(story_id, f"s{story_id}"))
+        cache.put(make_story(2, "s2", text="edited"))
+        cache.close()
+
+        cache = StoryCache(max_entries=1, db_path=db_path, max_disk_entries=3)
+        cache.put(make_story(4, "s4"))
+        rows = [row[0] for row in cache._db.execute("SELECT id FROM stories ORDER BY id")]
+        assert rows == [2, 3, 4]
+        cache.close()
+
+    def test_missing_keys_expire_and_clear_on_publish(self):
+        """Test the negative cache for stories Storyblok does not have."""
+        cache = StoryCache(negative_ttl=60)
+        cache.put_missing("coming-soon")
+        cache.put_missing(7)
+        assert cache.is_missing("coming-soon") and cache.is_missing(7)
+        cache.put(make_story(7, "coming-soon"))
+        assert not cache.is_missing("coming-soon") and not cache.is_missing(7)
+
+        cache.put_missing(8)
+        cache.invalidate(story_id=8)
+        assert not cache.is_missing(8)
+
+        expired = StoryCache(negative_ttl=0.01)
+        expired.put_missing(9)
+        expired._missing[9] -= 1
+        assert not expired.is_missing(9)
+
+    @pytest.mark.parametrize("header,expected", [
+        ('"abc"', True), ('W/"abc"', True), ('"x", "abc"', True), ("*", True), ('"x"', False), (None, False),
+    ])
+    def test_etag_matches(self, header, expected):
+        """Test If-None-Match evaluation."""
+        assert etag_matches(header, '"abc"') is expected
+
+
+class FakeFetcher:
+    """Stands in for the Storyblok CDN client."""
+
+    def __init__(self, stories):
+        self.stories = stories
+        self.calls = 0
+        self.cache_version = 0
+
+    async def fetch(self, key):
+        self.calls += 1
+        return self.stories.get(key)
+
+    def bump_cache_version(self):
+        self.cache_version += 1
+
+
+class FailingFetcher:
+    """CDN client whose every fetch raises ``error``."""
+
+    def __init__(self, error):
+        self.error = error
+
+    async def fetch(self, key):
+        raise self.error
+
+
+class TestStoryFetcher:
+    """Test Content Delivery API requests against a mock transport."""
+
+    def test_concurrent_fetches_share_one_request(self):
+        """Test single-flight fetching and that requests carry the cache version."""
+        requests = []
+
+        async def handler(request):
+            requests.append(request)
+            await asyncio.sleep(0.01)
+            return httpx.Response(200, json={"story": make_story(1, "a")})
+
+        async def scenario():
+            fetcher = StoryFetcher("token", transport=httpx.MockTransport(handler))
+            stories = await asyncio.gather(*(fetcher.fetch("a") for _ in range(5)))
+            fetcher.bump_cache_version()
+            await fetcher.fetch("a")
+            await fetcher.close()
+            return fetcher, stories
+
+        fetcher, stories = asyncio.run(scenario())
+        assert all(story["id"] == 1 for story in stories)
+        assert len(requests) == 2
+        cache_versions = [int(request.url.params["cv"]) for request in requests]
+        assert cache_versions[1] == fetcher.cache_version > cache_versions[0]
+
+    def test_cache_version_redirects_are_followed(self):
+        """Test that Storyblok's redirect to the current cv is followed."""
+        async def handler(request):
+            if request.url.params["cv"] != "42":
+                return httpx.Response(301, headers={"location": str(request.url.copy_set_param("cv", "42"))})
+            return httpx.Response(200, json={"story": make_story(1, "a")})
+
+        async def scenario():
+            fetcher = StoryFetcher("token", transport=httpx.MockTransport(handler))
+            try:
+                return await fetcher.fetch(1)
+            finally:
+                await fetcher.close()
+
+        assert asyncio.run(scenario())["id"] == 1
+
+    def test_iter_stories_pages_until_a_short_page(self):
+        """Test that listing pages through /stories and stops on the first short page."""
+        pages = []
+
+        async def handler(request):
+            page = int(request.url.params["page"])
+            pages.append(page)
+            count = 2 if page < 3 else 1
+            first = (page - 1) * 2 + 1
+            return httpx.Response(200, json={"stories": [make_story(i, f"s-{i}") for i in range(first, first + count)]})
+
+        async def scenario():
+            fetcher = StoryFetcher("token", transport=httpx.MockTransport(handler))
+            try:
+                return [story["id"] async for story in fetcher.iter_stories(per_page=2)]
+            finally:
+                await fetcher.close()
+
+        assert asyncio.run(scenario()) == [1, 2, 3, 4, 5]
+        assert pages == [1, 2, 3]
+
+
+class TestStoryEndpoint:
+    """Test the cached /stories read endpoint and webhook invalidation."""
+
+    def test_miss_hit_and_not_modified(self, client, worker_state, monkeypatch):
+        """Test that a miss is fetched once, then served from cache with ETag/304."""
+        fetcher = FakeFetcher({"coffee-cupping-night": make_story(501, "coffee-cupping-night")})
+        monkeypatch.setattr(worker_state, "story_fetcher", fetcher)
+
+        first = client.get("/stories/coffee-cupping-night")
+        assert first.status_code == 200
+        assert first.headers["x-cache"] == "MISS"
+
+        second = client.get("/stories/501")
+        assert second.headers["x-cache"] == "HIT"
+        assert second.content == first.content
+
+        cached = client.get("/stories/coffee-cupping-night", headers={"If-None-Match": first.headers["etag"]})
+        assert cached.status_code == 304
+        assert fetcher.calls == 1
+
+    def test_not_found_is_remembered_until_published(self, client, post_webhook, worker_state, monkeypatch):
+        """Test that repeated requests for a missing story reach Storyblok once."""
+        fetcher = FakeFetcher({})
+        monkeypatch.setattr(worker_state, "story_fetcher", fetcher)
+        assert client.get("/stories/coming-soon").status_code == 404
+        assert client.get("/stories/coming-soon").status_code == 404
+        assert fetcher.calls == 1
+
+        fetcher.stories["coming-soon"] = make_story(701, "coming-soon")
+        assert post_webhook({"action": "published", "story_id": 701, "full_slug": "coming-soon"}).status_code == 200
+        assert fetcher.cache_version == 1
+        assert client.get("/stories/coming-soon").status_code == 200
+
+    @pytest.mark.parametrize("error, status", [
+        (httpx.ConnectError("connection refused"), 503),
+        (httpx.ReadTimeout("timed out"), 503),
+        (httpx.HTTPStatusError("401", request=httpx.Request("GET", "https://cdn"),
+                               response=httpx.Response(401)), 502),
+    ])
+    def test_upstream_errors_map_to_gateway_statuses(self, client, worker_state, monkeypatch, error, status):
+        """Test that Storyblok failures on a miss return 502/503 instead of a bare 500."""
+        monkeypatch.setattr(worker_state, "story_fetcher", FailingFetcher(error))
+        assert client.get("/stories/not-cached-yet").status_code == status
+
+    def test_webhooks_invalidate_precisely(self, client, post_webhook, worker_state, monkeypatch):
+        """Test that a published webhook replaces only the affected story."""
+        monkeypatch.setattr(worker_state, "story_fetcher", FakeFetcher({}))
+        worker_state.story_cache.put(make_story(601, "event-a"))
+        worker_state.story_cache.put(make_story(602, "event-b"))
+        old_etag = client.get("/stories/event-a").headers["etag"]
+
+        updated = make_story(601, "event-a", text="Moved to Friday")
+        assert post_webhook({"action": "published", "story_id": 601, "full_slug": "event-a", "story": updated}).status_code == 200
+        response = client.get("/stories/event-a")
+        assert response.headers["etag"] != old_etag
+        assert response.json()["story"]["content"]["text"] == "Moved to Friday"
+        assert client.get("/stories/event-b").headers["x-cache"] == "HIT"
+
+        post_webhook({"action": "deleted", "story_id": 601, "full_slug": "event-a"})
+        assert client.get("/stories/event-a").status_code == 404
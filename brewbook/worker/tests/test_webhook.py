@@ -1,15 +1,11 @@
+import asyncio
 import hashlib
 import hmac
+
+import httpx
 import pytest
-from fastapi.testclient import TestClient
 from unittest.mock import patch
-import os
-
-os.environ["STORYBLOK_WEBHOOK_SECRET"] = "test_secret_123"
-
-from main import app
 
-client = TestClient(app)
 
 class TestWebhookEndpoint:
     """Test suite for Storyblok webhook endpoint validation."""
@@ -23,7 +19,7 @@ class TestWebhookEndpoint:
             hashlib.sha256
         ).hexdigest()
     
-    def test_valid_webhook_passes(self):
+    def test_valid_webhook_passes(self, client):
         """Test that a valid webhook request (correct signature) is accepted with 200 OK."""
         payload = b'{"action": "published", "story_id": 123}'
         signature = self.generate_valid_signature(payload)
@@ -37,7 +33,7 @@ class TestWebhookEndpoint:
         assert response.status_code == 200
         assert response.json() == {"ok": True}
     
-    def test_invalid_signature_fails(self):
+    def test_invalid_signature_fails(self, client):
         """Test that a request with mismatched signature fails with 400 Bad Request."""
         payload = b'{"action": "published", "story_id": 123}'
         invalid_signature = "invalid_signature_123"
@@ -51,7 +47,7 @@ class TestWebhookEndpoint:
         assert response.status_code == 400
         assert response.json() == {"error": "Invalid signature"}
     
-    def test_missing_signature_fails(self):
+    def test_missing_signature_fails(self, client):
         """Test that a request with missing webhook-signature header fails with 400 Bad Request."""
         payload = b'{"action": "published", "story_id": 123}'
         
@@ -64,7 +60,7 @@ class TestWebhookEndpoint:
         assert response.status_code == 400
         assert response.json() == {"error": "Invalid signature"}
     
-    def test_empty_signature_fails(self):
+    def test_empty_signature_fails(self, client):
         """Test that a request with empty signature fails."""
         payload = b'{"action": "published", "story_id": 123}'
         
@@ -77,7 +73,7 @@ class TestWebhookEndpoint:
         assert response.status_code == 400
         assert response.json() == {"error": "Invalid signature"}
     
-    def test_different_payload_same_signature_fails(self):
+    def test_different_payload_same_signature_fails(self, client):
         """Test that changing payload but keeping same signature fails."""
         original_payload = b'{"action": "published", "story_id": 123}'
         modified_payload = b'{"action": "published", "story_id": 456}'
@@ -93,6 +89,110 @@ class TestWebhookEndpoint:
         assert response.json() == {"error": "Invalid signature"}
 
 
+    @pytest.mark.parametrize("story", [
+        {"slug": "no-id", "content": {"component": "page", "body": []}},
+        {"id": 9001, "slug": "bad-content", "content": "oops"},
+    ])
+    def test_malformed_story_is_ignored(self, post_webhook, worker_state, story):
+        """Test that a verified payload with an unusable story is accepted, not cached or indexed."""
+        response = post_webhook({"action": "published", "story_id": 9001, "story": story})
+        
+        assert response.status_code == 200
+        assert worker_state.story_cache.get(9001) is None
+        assert len(worker_state.facet_index) == 0
+    
+    def test_processing_error_is_not_a_signature_failure(self, post_webhook, worker_state):
+        """Test that a failure after verification returns 500 instead of an invalid-signature 400."""
+        with patch.object(worker_state, "apply_story_event", side_effect=RuntimeError("boom")):
+            response = post_webhook({"action": "published", "story_id": 123})
+        
+        assert response.status_code == 500
+        assert response.json() == {"error": "Webhook processing failed"}
+
+
+def cafe_story(story_id, slug, lat=38.7223, lng=-9.1393):
+    """Build a minimal page story with a cafe blok."""
+    return {
+        "id": story_id,
+        "slug": slug,
+        "full_slug": f"cafes/{slug}",
+        "content": {"component": "page", "body": [{"component": "cafe", "geo_location": f"{lat},{lng}"}]},
+    }
+
+
+class StubFetcher:
+    """Stands in for the Storyblok CDN client, by story id."""
+
+    def __init__(self, stories, error=None):
+        self.stories = {story["id"]: story for story in stories}
+        self.error = error
+        self.fetched = []
+
+    async def fetch(self, key):
+        self.fetched.append(key)
+        if self.error:
+            raise self.error
+        return self.stories.get(key)
+
+    async def iter_stories(self, per_page=100):
+        for story in self.stories.values():
+            yield story
+
+    def bump_cache_version(self):
+        pass
+
+
+class TestStoryblokLoading:
+    """Test filling the café indexes from the Content Delivery API."""
+
+    def test_bare_published_webhook_fetches_and_indexes(self, post_webhook, worker_state, monkeypatch):
+        """Test that a published webhook without content is fetched, cached and indexed after the response."""
+        fetcher = StubFetcher([cafe_story(42, "tasca")])
+        monkeypatch.setattr(worker_state, "story_fetcher", fetcher)
+
+        response = post_webhook({"action": "published", "story_id": 42, "full_slug": "cafes/tasca"})
+
+        assert response.json() == {"ok": True}
+        assert fetcher.fetched == [42]
+        assert worker_state.story_cache.get(42) is not None
+        assert [hit["slug"] for hit in worker_state.geo_index.nearest(38.72, -9.14, 5)] == ["tasca"]
+
+    def test_fetch_failure_keeps_the_webhook_successful(self, post_webhook, worker_state, monkeypatch):
+        """Test that a Storyblok outage during the background fetch leaves the indexes untouched."""
+        monkeypatch.setattr(worker_state, "story_fetcher", StubFetcher([], error=httpx.ConnectError("refused")))
+
+        response = post_webhook({"action": "published", "story_id": 42, "full_slug": "cafes/tasca"})
+
+        assert response.status_code == 200
+        assert len(worker_state.geo_index) == 0
+
+    def test_fetch_overtaken_by_a_newer_event_is_dropped(self, worker_state, monkeypatch):
+        """Test that a fetch finishing after an unpublish does not re-index the story."""
+        monkeypatch.setattr(worker_state, "story_fetcher", StubFetcher([cafe_story(42, "tasca")]))
+        published = {"action": "published", "story_id": 42, "full_slug": "cafes/tasca"}
+
+        async def scenario():
+            assert worker_state.apply_story_event(published)
+            refresh = asyncio.ensure_future(worker_state.refresh_published_story(published, seen=1))
+            worker_state.apply_story_event({"action": "unpublished", "story_id": 42, "full_slug": "cafes/tasca"})
+            await refresh
+
+        asyncio.run(scenario())
+        assert len(worker_state.geo_index) == 0
+        assert worker_state.story_cache.get(42) is None
+
+    def test_startup_load_skips_stories_updated_by_webhooks(self, post_webhook, worker_state, monkeypatch):
+        """Test that the startup load indexes every café except those a webhook already changed."""
+        fetcher = StubFetcher([cafe_story(1, "tasca"), cafe_story(2, "gone"), cafe_story(3, "kiosk", lat=41.15, lng=-8.61)])
+        monkeypatch.setattr(worker_state, "story_fetcher", fetcher)
+        post_webhook({"action": "deleted", "story_id": 2, "full_slug": "cafes/gone"})
+
+        asyncio.run(worker_state.load_indexes())
+
+        slugs = {hit["slug"] for hit in worker_state.geo_index.nearest(40.0, -9.0, 10)}
+        assert slugs == {"tasca", "kiosk"}
+
+
 class TestWebhookValidator:
     """Test the WebhookValidator class directly."""
     
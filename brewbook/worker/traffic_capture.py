@@ -0,0 +1,160 @@
+import json
+import logging
+import os
+import queue
+import struct
+import threading
+import zlib
+from typing import Dict, Iterator, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"BBWCAP1\n"
+
+# arrival time (unix seconds, float64), headers length, body length
+_RECORD = struct.Struct("<dII")
+
+# Hop-by-hop / recomputed headers that are not worth storing
+_SKIPPED_HEADERS = frozenset({"host", "content-length", "connection", "accept-encoding"})
+
+# zlib window bits for gzip framing
+_GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+_READ_SIZE = 64 * 1024
+
+# Records waiting for the writer thread; beyond this, new records are dropped
+# rather than letting a stalled disk grow the worker's memory
+_MAX_PENDING = 10000
+
+
+class CapturedRequest(NamedTuple):
+    """One recorded webhook request."""
+    arrival: float
+    headers: Dict[str, str]
+    body: bytes
+
+
+class CaptureWriter:
+    """
+    Appends verified webhook requests to a gzip-compressed capture file.
+
+    Layout (inside gzip): an 8-byte magic line, then one record per request:
+    ``<d I I>`` (arrival time, headers length, body length) followed by the
+    headers as compact JSON and the raw body. ``record()`` only queues the
+    request; a writer thread encodes, compresses and sync-flushes each record
+    to the file, so the webhook handler never waits on zlib or the disk and a
+    worker that crashes or is still running leaves a readable capture.
+    ``close()`` writes what is queued and ends the gzip member. Each writer
+    session appends a new gzip member, which readers see as one continuous
+    stream.
+    """
+
+    def __init__(self, path: str, max_pending: int = _MAX_PENDING):
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.path = path
+        self.count = 0
+        self.dropped = 0
+        self._file = open(path, "ab")
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, _GZIP_WBITS)
+        self._pending: "queue.Queue[Optional[Tuple[float, Dict[str, str], bytes]]]" = queue.Queue(max_pending)
+        if is_new:
+            self._write(MAGIC)
+        self._thread = threading.Thread(target=self._run, name="capture-writer", daemon=True)
+        self._thread.start()
+
+    def record(self, arrival: float, headers: Dict[str, str], body: bytes):
+        """Queue a request for writing; never blocks the caller."""
+        try:
+            self._pending.put_nowait((arrival, headers, body))
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                logger.warning(f"Capture writer is behind; dropped {self.dropped} requests so far")
+
+    def flush(self):
+        """Block until every queued record is written and flushed to the file."""
+        self._pending.join()
+
+    def close(self):
+        if self._thread.is_alive():
+            self._pending.put(None)
+            self._thread.join()
+        if not self._file.closed:
+            self._file.write(self._compressor.flush(zlib.Z_FINISH))
+            self._file.close()
+
+    def _run(self):
+        while True:
+            item = self._pending.get()
+            try:
+                if item is None:
+                    return
+                arrival, headers, body = item
+                kept = {name: value for name, value in headers.items() if name.lower() not in _SKIPPED_HEADERS}
+                header_bytes = json.dumps(kept, separators=(",", ":")).encode("utf-8")
+                self._write(_RECORD.pack(arrival, len(header_bytes), len(body)) + header_bytes + body)
+                self.count += 1
+            except Exception as e:
+                logger.error(f"Failed to write capture record to {self.path}: {e}")
+            finally:
+                self._pending.task_done()
+
+    def _write(self, data: bytes):
+        self._file.write(self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH))
+        self._file.flush()
+
+
+def _decompressed_chunks(path: str) -> Iterator[bytes]:
+    """Decompress every gzip member in ``path``, tolerating an unfinished last member."""
+    decompressor = zlib.decompressobj(_GZIP_WBITS)
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(_READ_SIZE)
+            if not data:
+                return
+            while data:
+                try:
+                    yield decompressor.decompress(data)
+                except zlib.error as e:
+                    raise ValueError(f"{path} is corrupt: {e}") from e
+                if not decompressor.eof:
+                    break
+                # Member finished; the rest of the block starts the next one
+                data = decompressor.unused_data
+                decompressor = zlib.decompressobj(_GZIP_WBITS)
+
+
+def read_capture(path: str) -> Iterator[CapturedRequest]:
+    """
+    Stream the requests stored in a capture file, in recorded order.
+
+    Captures from a worker that crashed or is still writing end after the
+    last complete record; a partially written record is skipped.
+
+    Raises:
+        ValueError: If the file is not a webhook capture or is corrupt
+    """
+    buffer = bytearray()
+    checked_magic = False
+    for chunk in _decompressed_chunks(path):
+        buffer += chunk
+        if not checked_magic:
+            if len(buffer) < len(MAGIC):
+                continue
+            if bytes(buffer[:len(MAGIC)]) != MAGIC:
+                raise ValueError(f"{path} is not a webhook capture file")
+            del buffer[:len(MAGIC)]
+            checked_magic = True
+        offset = 0
+        while len(buffer) - offset >= _RECORD.size:
+            arrival, header_length, body_length = _RECORD.unpack_from(buffer, offset)
+            end = offset + _RECORD.size + header_length + body_length
+            if end > len(buffer):
+                break
+            header_end = offset + _RECORD.size + header_length
+            headers = json.loads(bytes(buffer[offset + _RECORD.size:header_end]))
+            yield CapturedRequest(arrival, headers, bytes(buffer[header_end:end]))
+            offset = end
+        del buffer[:offset]
+    if not checked_magic:
+        raise ValueError(f"{path} is not a webhook capture file")
@@ -70,3 +70,9 @@ class WebhookLogger:
     def log_missing_signature(client_ip: str):
         """Log missing signature header."""
         logger.warning(f"Missing signature attempt from IP {client_ip}")
+    
+    @staticmethod
+    def log_processing_error(client_ip: str, event_type: Optional[str], error: Exception):
+        """Log a verified webhook that failed while being applied."""
+        logger.error(f"Failed to process verified webhook from IP {client_ip}, event: {event_type or 'unknown'}: "
+                     f"{type(error).__name__}: {error}", exc_info=error)